@@ -4,3 +4,6 @@ GUILD_WHITELISTS = {
 		1 # Channel ID
 	}
 }
+ADMIN_USER_IDS = {
+	2 # User ID allowed to use admin commands like !botstats
+}
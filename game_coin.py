@@ -1,6 +1,7 @@
 import random
 
-from game_common import ActiveGame, AvailableGame, COMMAND_PREFIX
+from game_common import ActiveGame, AvailableGame, COMMAND_PREFIX, SEED_BYTES
+from game_events import EVENT_GUESS, record_event, record_start
 
 COIN_COMMAND = COMMAND_PREFIX + "coin"
 HEADS = "heads"
@@ -9,18 +10,33 @@ GUESSES = [HEADS, TAILS]
 HEADS_COMMAND = COMMAND_PREFIX + HEADS
 TAILS_COMMAND = COMMAND_PREFIX + TAILS
 GUESS_COMMANDS = [HEADS_COMMAND, TAILS_COMMAND]
+IDLE_COIN_TIMEOUT = 5 * 60
 
 class GameCoinInstance(ActiveGame):
+	__slots__ = ("seed",)
+
+	def __init__(self, seed = None):
+		super().__init__()
+		self.seed = self.new_seed() if seed is None else seed
+
 	async def handle_public_message(self, base_command, message):
 		#wrong command, the game is still going
 		if base_command not in GUESS_COMMANDS:
 			return True
-		await self.conclude(message, base_command == HEADS_COMMAND)
+		guessed_heads = base_command == HEADS_COMMAND
+		was_heads = self.flip()
+		record_event(self.events, EVENT_GUESS, bytes([guessed_heads, was_heads]))
+		await self.conclude(message, guessed_heads, was_heads)
 		return False
 
+	def to_snapshot(self):
+		return {"seed": self.seed, "events": self.events.hex()}
+
+	def flip(self):
+		return random.Random(self.seed).random() < 0.5
+
 	@staticmethod
-	async def conclude(message, guessed_heads):
-		was_heads = random.random() < 0.5
+	async def conclude(message, guessed_heads, was_heads):
 		correct_guess = was_heads == guessed_heads
 		await message.channel.send(
 			"Result: {}. You {}".format(HEADS if was_heads else TAILS, "win!" if correct_guess else "lose."))
@@ -29,6 +45,18 @@ class GameCoin(AvailableGame):
 	def base_command(self):
 		return COIN_COMMAND
 
+	def game_commands(self):
+		return GUESS_COMMANDS
+
+	def start_player_count(self):
+		return 0
+
+	def move_player_count(self):
+		return 0
+
+	def idle_timeout(self):
+		return IDLE_COIN_TIMEOUT
+
 	async def share_rules(self, channel):
 		await channel.send(
 			f"To flip a coin, start the game with `{COIN_COMMAND}`" +
@@ -42,8 +70,15 @@ class GameCoin(AvailableGame):
 		#the game was started and finished in one command
 		contents = message.content.split(" ")
 		if len(contents) >= 2 and contents[1] in GUESSES:
-			await GameCoinInstance.conclude(message, contents[1] == HEADS)
+			await GameCoinInstance.conclude(message, contents[1] == HEADS, GameCoinInstance().flip())
 			return True
 
 		await message.channel.send(f"`{HEADS_COMMAND}` or `{TAILS_COMMAND}`?")
-		return GameCoinInstance()
+		instance = GameCoinInstance()
+		record_start(instance.events, COIN_COMMAND, instance.seed.to_bytes(SEED_BYTES, "little"))
+		return instance
+
+	async def restore_game(self, snapshot, channel, fetch_player):
+		instance = GameCoinInstance(snapshot.get("seed"))
+		instance.events = bytearray.fromhex(snapshot.get("events", ""))
+		return instance
@@ -1,29 +1,159 @@
+import asyncio
+import discord
+import hashlib
 import random
+import struct
 
 COMMAND_PREFIX = "!"
+#discord.py already waits out per-route rate limit buckets, this only caps how many DMs are in flight at once
+DM_CONCURRENCY = 5
+DM_ATTEMPTS = 3
+DM_RETRY_DELAY = 0.5
+NO_COMMANDS = frozenset()
+#how many commands may pile up below a board message before the board is moved back to the bottom of the channel
+BOARD_EDIT_WINDOW = 3
+SEED_BITS = 64
+SEED_BYTES = SEED_BITS // 8
+#players listed per message of a board that's split over several messages
+BOARD_PAGE_PLAYERS = 15
+#how long a game can go without a move before it's concluded, in seconds
+IDLE_TIMEOUT = 30 * 60
 
 class BotUser:
-	def __init__(self, name):
+	def __init__(self, name, log):
 		self.name = name
 		self.id = object()
 		self.mention = "@" + name
 		self.bot = False #as in not a Discord bot
+		self.log = log
 
 	async def send(self, message):
-		print(f" : {self.name} << {message}")
+		self.log.log("bot_message", bot=self.name, content=message)
+
+#a message that gets replaced with the latest game state; updates that are queued while another update is being
+#	sent are merged into one, and the message is edited in place while it's still near the bottom of the channel
+class BoardMessage:
+	__slots__ = ("channel", "message", "commands_below", "messages_below", "pending_content", "lock")
+
+	def __init__(self, channel):
+		self.channel = channel
+		self.message = None
+		self.commands_below = []
+		#ids of the messages sent below the board, followed commands or not, up to one more than the edit window
+		self.messages_below = []
+		self.pending_content = None
+		self.lock = asyncio.Lock()
+
+	#the next update is in response to this command, which was sent below the board
+	def follow(self, message):
+		self.commands_below.append(message.id)
+
+	#a message was sent in the channel, by anyone, the bot included
+	def notice(self, message_id):
+		#message ids are snowflakes, so later messages have bigger ids
+		if self.message and message_id > self.message.id and len(self.messages_below) <= BOARD_EDIT_WINDOW:
+			self.messages_below.append(message_id)
+
+	#only while everything below the board is a command it followed; the channel's last message is checked too, in
+	#	case messages were sent that weren't noticed
+	def can_edit(self):
+		last_message_id = self.channel.last_message_id
+		return (len(self.messages_below) <= BOARD_EDIT_WINDOW
+			and all(message_id in self.commands_below for message_id in self.messages_below)
+			and (last_message_id == self.message.id or last_message_id in self.commands_below))
+
+	async def post(self, content):
+		self.pending_content = content
+		async with self.lock:
+			#a later update already went out while we were waiting
+			if self.pending_content is None:
+				return
+			content = self.pending_content
+			self.pending_content = None
+			if self.message and self.can_edit():
+				try:
+					await self.message.edit(content=content)
+					return
+				#deleted by someone else, or while the bot was offline for a restored board; a new one is sent instead
+				except discord.NotFound:
+					self.message = None
+			if self.message:
+				try:
+					await self.message.delete()
+				except discord.NotFound:
+					pass
+			#only keep the id around, full messages hold onto a lot more than the board needs
+			self.message = self.channel.get_partial_message((await self.channel.send(content)).id)
+			self.commands_below = []
+			#messages noticed while the board was being sent may have ended up below it
+			self.messages_below = [message_id for message_id in self.messages_below if message_id > self.message.id]
+
+#a board split over several messages that stay where they were first sent, for lists too long for one message; only
+#	the pages whose content changed are edited
+class BoardPages:
+	__slots__ = ("channel", "messages", "page_hashes")
+
+	def __init__(self, channel):
+		self.channel = channel
+		self.messages = []
+		#hashes of what each page was last set to, or None if that's not known
+		self.page_hashes = []
+
+	async def post(self, pages):
+		for i, content in enumerate(pages):
+			content_hash = hash(content)
+			if i == len(self.messages):
+				self.messages.append(self.channel.get_partial_message((await self.channel.send(content)).id))
+				self.page_hashes.append(content_hash)
+			elif self.page_hashes[i] != content_hash:
+				try:
+					await self.messages[i].edit(content=content)
+				#a page was deleted, by someone else or while the bot was offline for a restored board; the whole board
+				#	is sent again, so that its pages stay in order
+				except discord.NotFound:
+					await self.repage(pages)
+					return
+				self.page_hashes[i] = content_hash
+
+	async def repage(self, pages):
+		for message in self.messages:
+			try:
+				await message.delete()
+			except discord.NotFound:
+				pass
+		self.messages = []
+		self.page_hashes = []
+		await self.post(pages)
 
 class ActiveGame:
+	__slots__ = ("available_game", "commands", "events")
+
+	def __init__(self):
+		#the AvailableGame that started this game and its in-game commands, set by the client when the game starts
+		self.available_game = None
+		self.commands = NO_COMMANDS
+		#records from game_events of everything that happened in this game, for replaying it later
+		self.events = bytearray()
+
+	#a random seed for a new game, so that everything random in it can be reproduced from the seed
+	@staticmethod
+	def new_seed():
+		return random.getrandbits(SEED_BITS)
+
+	#count random 32-bit numbers derived from seed_bytes with one SHAKE-128 hash, for games that need a few reproducible
+	#	random numbers at a time; seeding a random.Random for them would cost more than using it
+	@staticmethod
+	def seeded_random_words(seed_bytes, count):
+		return struct.unpack(f"<{count}I", hashlib.shake_128(seed_bytes).digest(count * 4))
+
+	#shuffle the deck once and slice it into hand_count hands; the shuffle is Fisher-Yates, scaling one of random_words
+	#	down to each index, which is biased by less than one in 2^32 / len(deck)
 	@staticmethod
-	def extract_random_hand(count, deck):
-		hand = []
-		for _ in range(0, count):
-			next_card_i = int(random.random() * len(deck))
-			next_card = deck[next_card_i]
-			temp_card = deck.pop()
-			if next_card_i < len(deck):
-				deck[next_card_i] = temp_card
-			hand.append(next_card)
-		return hand
+	def deal_random_hands(random_words, hand_count, cards_per_hand, deck):
+		for i in range(len(deck) - 1, 0, -1):
+			j = random_words[i] * (i + 1) >> 32
+			deck[i], deck[j] = deck[j], deck[i]
+		return [deck[start:start + cards_per_hand] for start in range(0, hand_count * cards_per_hand, cards_per_hand)]
 
 	@staticmethod
 	def list_phrase(items, use_and = True):
@@ -37,17 +167,68 @@ class ActiveGame:
 			items.append(last_item)
 			return phrase_without_last + (", and " if use_and else ", or ") + last_item
 
+	#send every (player, message) pair concurrently, and return the players who could not be messaged
+	@staticmethod
+	async def send_private_messages(player_messages):
+		semaphore = asyncio.Semaphore(DM_CONCURRENCY)
+
+		async def send_private_message(player, message):
+			async with semaphore:
+				for attempt in range(0, DM_ATTEMPTS):
+					try:
+						await player.send(message)
+						return None
+					except discord.HTTPException as exception:
+						#403 means the player has DMs closed, there's no point in retrying
+						if exception.status == 403 or attempt == DM_ATTEMPTS - 1:
+							return player
+					await asyncio.sleep(DM_RETRY_DELAY * 2 ** attempt)
+
+		failed_players = await asyncio.gather(
+			*(send_private_message(player, message) for player, message in player_messages))
+		return [player for player in failed_players if player]
+
+	#a message was sent in the game's channel, by anyone, the bot included; called before it's handled
+	def notice_message(self, message):
+		pass
+
+	#the users playing this game, if it has a fixed set of players
+	def players(self):
+		return []
+
 	async def handle_public_message(self, base_command, message):
 		await message.channel.send("<response missing>")
 		return False
 
+	#return a JSON-compatible copy of the game state, or None if this game can't be restored later
+	def to_snapshot(self):
+		return None
+
 class AvailableGame:
 	def base_command(self):
 		return "<command missing>"
 
+	def game_commands(self):
+		return []
+
+	#how many players the command that starts the game names, or None for any number
+	def start_player_count(self):
+		return None
+
+	#how many players every in-game command names
+	def move_player_count(self):
+		return 1
+
+	def idle_timeout(self):
+		return IDLE_TIMEOUT
+
 	async def share_rules(self, channel):
 		await channel.send("<rules missing>")
 
 	async def start_new_game(self, base_command, message):
 		await message.channel.send("<game missing>")
 		return None
+
+	#rebuild an ActiveGame from its to_snapshot() state, using fetch_player(user_id) to look up players
+	async def restore_game(self, snapshot, channel, fetch_player):
+		return None
@@ -1,6 +1,7 @@
 import random
 
-from game_common import ActiveGame, AvailableGame, COMMAND_PREFIX
+from game_common import ActiveGame, AvailableGame, BOARD_PAGE_PLAYERS, BoardMessage, BoardPages, COMMAND_PREFIX, SEED_BYTES
+from game_events import EVENT_DEAL, EVENT_END, EVENT_INVESTIGATE, record_event, record_start
 
 HIDDEN_CARD = "🟪"
 ELDER_SIGN_CARD = "🟨"
@@ -12,103 +13,216 @@ CARD_TEXT_SINGULAR = 0
 CARD_TEXT_PLURAL = 1
 CARD_TEXT_FOUND = 2
 HAND_CARD_ORDER = [ELDER_SIGN_CARD, CTHULHU_CARD, BLANK_CARD]
+#hands store cards as their index in HAND_CARD_ORDER
+ELDER_SIGN_INDEX = HAND_CARD_ORDER.index(ELDER_SIGN_CARD)
+CTHULHU_INDEX = HAND_CARD_ORDER.index(CTHULHU_CARD)
+BLANK_INDEX = HAND_CARD_ORDER.index(BLANK_CARD)
 TOTAL_ROUNDS = 4
+#games with more players than this list hands on board pages that are edited in place, and only post the round
+#	status below them, so that a turn only edits the page of the player whose card was flipped
+PAGED_BOARD_PLAYERS = 20
+#(hidden count, flipped cards) -> how that hand looks on the board, shared by every game
+HAND_BOARD_TEXTS = {}
+
+#the first `hidden` cards haven't been flipped yet, the rest have been flipped, most recent first
+class CthulhuHand:
+	__slots__ = ("cards", "hidden", "board_text")
+
+	def __init__(self, cards, hidden):
+		self.cards = cards
+		self.hidden = hidden
+		self.board_text = self.render_board_text()
+
+	#everything on this hand's board line up to the player's mention
+	def render_board_text(self):
+		key = (self.hidden, bytes(self.cards[self.hidden:]))
+		board_text = HAND_BOARD_TEXTS.get(key)
+		if not board_text:
+			board_text = " ".join([HIDDEN_CARD] * self.hidden + ["  "] + self.revealed_cards() + [": ", ""])
+			HAND_BOARD_TEXTS[key] = board_text
+		return board_text
+
+	def count(self, card):
+		return self.cards.count(HAND_CARD_ORDER.index(card))
+
+	def flip(self):
+		self.hidden -= 1
+		self.board_text = self.render_board_text()
+		return HAND_CARD_ORDER[self.cards[self.hidden]]
+
+	def revealed_cards(self):
+		return [HAND_CARD_ORDER[card] for card in self.cards[self.hidden:]]
 
 class GameCthulhuInstance(ActiveGame):
-	def __init__(self, texts, channel, players, cultist_count, extra_roles_count):
+	__slots__ = (
+		"texts",
+		"channel",
+		"all_players",
+		"players_by_id",
+		"investigators",
+		"cultists",
+		"hands",
+		"next_player",
+		"elder_signs_found",
+		"round_progress",
+		"board",
+		"board_pages",
+		"current_round",
+		"seed",
+	)
+
+	def __init__(self, texts, channel, players, cultist_count, extra_roles_count, seed = None):
 		super().__init__()
+		self.seed = self.new_seed() if seed is None else seed
+		rng = random.Random(self.seed)
 		self.texts = texts
 		self.channel = channel
 		self.all_players = players
+		self.players_by_id = {player.id: player for player in players}
 		self.investigators = []
 		self.cultists = []
 		self.hands = {}
-		self.next_player = self.all_players[int(random.random() * len(players))]
+		self.next_player = self.all_players[rng.randrange(len(players))]
 		self.elder_signs_found = 0
 		self.round_progress = 0
-		self.current_turn_message = None
+		self.board = BoardMessage(channel)
+		self.board_pages = BoardPages(channel) if len(players) > PAGED_BOARD_PLAYERS else None
 		self.current_round = 0
-		self.investigate_verb = "investigate"
-		self.text_a_player = "a player"
-		self.text_one_player = "one `@player`"
-		self.text_yourself = "yourself"
-		self.text_you_found = "You found"
 
 		total_roles_count = len(players) + extra_roles_count
 		for player in players:
-			if random.random() < cultist_count / total_roles_count:
+			if rng.random() < cultist_count / total_roles_count:
 				self.cultists.append(player)
 				cultist_count -= 1
 			else:
 				self.investigators.append(player)
 			total_roles_count -= 1
 
+	@classmethod
+	async def restore(cls, texts, channel, snapshot, fetch_player):
+		players = [await fetch_player(player_id) for player_id in snapshot["players"]]
+		instance = cls(texts, channel, players, 0, 0, snapshot.get("seed"))
+		cultists = set(snapshot["cultists"])
+		instance.investigators = [player for i, player in enumerate(players) if i not in cultists]
+		instance.cultists = [player for i, player in enumerate(players) if i in cultists]
+		for player, hand in zip(players, snapshot["hands"]):
+			instance.hands[player] = CthulhuHand(bytearray(hand[1:]), hand[0])
+		instance.next_player = players[snapshot["next_player"]]
+		instance.elder_signs_found = snapshot["elder_signs_found"]
+		instance.round_progress = snapshot["round_progress"]
+		instance.current_round = snapshot["current_round"]
+		if snapshot["board_message"] is not None:
+			instance.board.message = channel.get_partial_message(snapshot["board_message"])
+		if instance.board_pages:
+			for page_message_id in snapshot.get("board_pages", []):
+				instance.board_pages.messages.append(channel.get_partial_message(page_message_id))
+				instance.board_pages.page_hashes.append(None)
+		instance.events = bytearray.fromhex(snapshot.get("events", ""))
+		return instance
+
+	def to_snapshot(self):
+		#bot test players only exist in memory
+		if not all(isinstance(player.id, int) for player in self.all_players):
+			return None
+		return {
+			"players": [player.id for player in self.all_players],
+			"cultists": [self.all_players.index(cultist) for cultist in self.cultists],
+			"hands": [[self.hands[player].hidden] + list(self.hands[player].cards) for player in self.all_players],
+			"next_player": self.all_players.index(self.next_player),
+			"elder_signs_found": self.elder_signs_found,
+			"round_progress": self.round_progress,
+			"current_round": self.current_round,
+			"board_message": self.board.message.id if self.board.message else None,
+			"board_pages": [message.id for message in self.board_pages.messages] if self.board_pages else [],
+			"seed": self.seed,
+			"events": self.events.hex(),
+		}
+
+	def notice_message(self, message):
+		self.board.notice(message.id)
+
+	def players(self):
+		return self.all_players
+
 	async def start_game(self):
-		for investigator in self.investigators:
-			await investigator.send(
-				f"{self.texts.game_title}: You are {self.texts.investigator_with_indefinite_article}")
-		for cultist in self.cultists:
-			await cultist.send(f"{self.texts.game_title}: You are {self.texts.cultist_with_indefinite_article}")
+		record_start(
+			self.events,
+			self.texts.start_game_command,
+			self.seed.to_bytes(SEED_BYTES, "little") +
+				bytes([self.all_players.index(self.next_player)] + [player in self.cultists for player in self.all_players]))
+		player_messages = [(investigator, self.texts.investigator_role_message) for investigator in self.investigators]
+		player_messages += [(cultist, self.texts.cultist_role_message) for cultist in self.cultists]
+		await self.send_hidden_info(player_messages)
 		await self.advance_round()
 
+	async def send_hidden_info(self, player_messages):
+		failed_players = await self.send_private_messages(player_messages)
+		if failed_players:
+			await self.channel.send(
+				self.list_phrase([player.mention for player in failed_players]) +
+					" could not be sent a direct message; please allow direct messages from server members")
+
 	async def advance_round(self):
 		self.current_round += 1
 		self.round_progress = 0
-		self.current_turn_message = None
+		self.board = BoardMessage(self.channel)
 		player_count = len(self.all_players)
 		cards_per_hand = TOTAL_ROUNDS + 2 - self.current_round
-		deck = [CTHULHU_CARD] + [ELDER_SIGN_CARD] * (player_count - self.elder_signs_found)
-		deck += [BLANK_CARD] * (player_count * cards_per_hand - len(deck))
-		for player in self.all_players:
-			hand = self.extract_random_hand(cards_per_hand, deck)
+		deck = bytearray([CTHULHU_INDEX]) + bytearray([ELDER_SIGN_INDEX]) * (player_count - self.elder_signs_found)
+		deck += bytearray([BLANK_INDEX]) * (player_count * cards_per_hand - len(deck))
+		dealt_hands = self.deal_hands(cards_per_hand, deck)
+		record_event(self.events, EVENT_DEAL, b"".join(dealt_hands))
+		player_messages = []
+		for player, cards in zip(self.all_players, dealt_hands):
+			hand = CthulhuHand(cards, cards_per_hand)
 			self.hands[player] = hand
 			hand_message_contents = []
 			for card_value in HAND_CARD_ORDER:
-				cards = sum(card is card_value for card in hand)
+				cards = hand.count(card_value)
 				plurality_case = CARD_TEXT_SINGULAR if cards == 1 else CARD_TEXT_PLURAL
 				if cards > 0:
 					hand_message_contents.append(
 						f"**{cards}**x {self.texts.card_texts[card_value][plurality_case]}")
-			hand.insert(0, len(hand))
-			await player.send(
-				f"Round {self.current_round}/{TOTAL_ROUNDS}: You have " +
-					self.list_phrase(hand_message_contents))
+			player_messages.append(
+				(player,
+					f"Round {self.current_round}/{TOTAL_ROUNDS}: You have " + self.list_phrase(hand_message_contents)))
+		await self.send_hidden_info(player_messages)
 		await self.post_game_state(None)
 
+	#a hand of cards for every player, in player order; every round's shuffle is derived from the game's seed and the
+	#	round number, so nothing random has to be kept around between rounds
+	def deal_hands(self, cards_per_hand, deck):
+		random_words = self.seeded_random_words(
+			(self.seed << 8 | self.current_round).to_bytes(SEED_BYTES + 1, "little"), len(deck))
+		return self.deal_random_hands(random_words, len(self.all_players), cards_per_hand, deck)
+
 	async def post_game_state(self, last_found_card):
 		player_count = len(self.all_players)
 		round_over = self.round_progress == player_count
-		elder_signs_plurality_case = CARD_TEXT_SINGULAR if self.elder_signs_found == 1 else CARD_TEXT_PLURAL
-		state = [
-			"Round {}/{}{}: {}/{} {} flipped, **{}**x {} found total, **{}** left".format(
+		state = []
+		if last_found_card:
+			state.append(self.texts.found_texts[last_found_card])
+		state.append(
+			self.texts.round_header_formats[self.elder_signs_found == 1].format(
 				self.current_round,
-				TOTAL_ROUNDS,
 				" concluded" if round_over else "",
 				self.round_progress,
 				player_count,
-				self.texts.card_plural,
 				self.elder_signs_found,
-				self.texts.card_texts[ELDER_SIGN_CARD][elder_signs_plurality_case],
-				player_count - self.elder_signs_found)
-		]
-		if last_found_card:
-			state.insert(0, f"{self.text_you_found} {self.texts.card_texts[last_found_card][CARD_TEXT_FOUND]}\n")
+				player_count - self.elder_signs_found))
 		if self.next_player and not round_over:
-			formatted_commands = self.list_phrase(
-				["`" + command + " @player`" for command in self.texts.investigate_commands], use_and=False)
-			state.append(
-				f"{self.next_player.mention}, you {self.investigate_verb} next." +
-				f" To {self.investigate_verb} {self.text_a_player}, use {formatted_commands}")
-		for player in self.all_players:
-			hand = self.hands[player]
-			hidden_cards = hand[0]
-			hand_contents = [HIDDEN_CARD] * hidden_cards + ["  "] + hand[hidden_cards + 1:] + [": ", player.mention]
-			state.append(" ".join(hand_contents))
-		if self.current_turn_message:
-			await self.current_turn_message.delete()
-		self.current_turn_message = await self.channel.send("\n".join(state))
+			state.append(self.texts.next_player_format.format(self.next_player.mention))
+		hand_lines = [self.hands[player].board_text + player.mention for player in self.all_players]
+		if self.board_pages:
+			await self.board_pages.post(
+				["\n".join(hand_lines[start:start + BOARD_PAGE_PLAYERS])
+					for start in range(0, len(hand_lines), BOARD_PAGE_PLAYERS)])
+		else:
+			state.extend(hand_lines)
+		await self.board.post("\n".join(state))
 
 	async def post_end_game_state(self, revealed_card, investigators_won):
+		record_event(self.events, EVENT_END, bytes([investigators_won]))
 		self.next_player = None
 		await self.post_game_state(revealed_card)
 		state = [
@@ -125,32 +239,35 @@ class GameCthulhuInstance(ActiveGame):
 			return True
 
 		if message.author.id != self.next_player.id:
-			if next((player for player in self.all_players if player.id == message.author.id), None):
+			if message.author.id in self.players_by_id:
 				await self.channel.send(message.author.mention + " it is not your turn yet")
 			else:
 				await self.channel.send(message.author.mention + ", you are not playing this game")
 			return True
 		if len(message.mentions) != 1:
 			await self.channel.send(
-				f"{message.author.mention}, you must {self.investigate_verb} {self.text_one_player}")
+				f"{message.author.mention}, you must {self.texts.investigate_verb} {self.texts.text_one_player}")
 			return True
 		to_player_id = message.mentions[0].id
 		if to_player_id == message.author.id:
 			await self.channel.send(
-				f"{message.author.mention}, you cannot {self.investigate_verb} {self.text_yourself}")
+				f"{message.author.mention}, you cannot {self.texts.investigate_verb} {self.texts.text_yourself}")
 			return True
-		to_player = next((player for player in self.all_players if player.id == to_player_id), None)
+		to_player = self.players_by_id.get(to_player_id)
 		if not to_player:
 			await self.channel.send(
 				message.author.mention + ", that person is not currently playing in this channel")
 			return True
 
 		#we found a valid player to investigate, assuming the game isn't over yet
+		record_event(
+			self.events,
+			EVENT_INVESTIGATE,
+			bytes([self.all_players.index(self.next_player), self.all_players.index(to_player)]))
 		self.next_player = to_player
 		self.round_progress += 1
-		hand = self.hands[to_player]
-		revealed_card = hand[hand[0]]
-		hand[0] -= 1
+		self.board.follow(message)
+		revealed_card = self.hands[to_player].flip()
 		if revealed_card is ELDER_SIGN_CARD:
 			self.elder_signs_found += 1
 		await message.add_reaction(revealed_card)
@@ -202,21 +319,32 @@ class GameCthulhu(AvailableGame):
 		self.card_plural = "stones"
 		self.hand_description = "what you have this round"
 		self.investigate_commands = [COMMAND_PREFIX + "to", COMMAND_PREFIX + "pass", COMMAND_PREFIX + "investigate"]
-		self.reskin_instance = None
-
-	@staticmethod
-	def to_card_text(card_text_formats):
-		return dict(
-			(card, [text_format.format(card) for text_format in text_formats])
-				for card, text_formats in card_text_formats)
-
-	def base_command(self):
-		return self.start_game_command
+		self.investigate_verb = "investigate"
+		self.text_a_player = "a player"
+		self.text_one_player = "one `@player`"
+		self.text_yourself = "yourself"
+		self.text_you_found = "You found"
+		self.compile_texts()
 
-	async def share_rules(self, channel):
+	#build every text that only depends on the skin, so games and rules don't have to rebuild them
+	def compile_texts(self):
 		formatted_commands = ActiveGame.list_phrase(
 			["`" + command + " @player`" for command in self.investigate_commands], use_and=False)
-		await channel.send(
+		self.investigator_role_message = f"{self.game_title}: You are {self.investigator_with_indefinite_article}"
+		self.cultist_role_message = f"{self.game_title}: You are {self.cultist_with_indefinite_article}"
+		self.found_texts = {
+			card: f"{self.text_you_found} {card_texts[CARD_TEXT_FOUND]}\n" for card, card_texts in self.card_texts.items()
+		}
+		#indexed by whether exactly one Elder Sign has been found
+		self.round_header_formats = [
+			f"Round {{}}/{TOTAL_ROUNDS}{{}}: {{}}/{{}} {self.card_plural} flipped," +
+				f" **{{}}**x {self.card_texts[ELDER_SIGN_CARD][plurality_case]} found total, **{{}}** left"
+				for plurality_case in [CARD_TEXT_PLURAL, CARD_TEXT_SINGULAR]
+		]
+		self.next_player_format = (
+			f"{{}}, you {self.investigate_verb} next." +
+			f" To {self.investigate_verb} {self.text_a_player}, use {formatted_commands}")
+		self.rules = (
 			f"To start a game, send a message `{self.start_game_command} @player @player ...` with at least 3" +
 			" players.\n\n" +
 			self.game_summary +
@@ -249,20 +377,16 @@ class GameCthulhu(AvailableGame):
 			f" {self.card_texts[ELDER_SIGN_CARD][CARD_TEXT_SINGULAR]} has not been found" +
 			f" ({self.cultist_plural}"" win)")
 
-	async def start_new_game(self, base_command, message):
-		if base_command != self.start_game_command:
-			return None
-
-		contents = message.content.split(" ")
-		players_count = len(message.mentions)
-		if players_count < 3:
-			await message.channel.send(self.game_title + " needs at least 3 @players to start")
-			return True
-		for player in message.mentions:
-			if player.bot:
-				await message.channel.send(player.mention + " is a bot and cannot play")
-				return True
+	@staticmethod
+	def to_card_text(card_text_formats):
+		return dict(
+			(card, [text_format.format(card) for text_format in text_formats])
+				for card, text_formats in card_text_formats)
 
+	#returns the cultist count, the number of extra roles dealt alongside the players' roles, and a description of how
+	#	many cultists there may be
+	@staticmethod
+	def role_counts(players_count):
 		#automatically determine cultist count
 		#default: 3/4/5/6 get 2, 7,8,9 get 3, etc.
 		cultist_count = max((players_count + 2) // 3, 2)
@@ -279,17 +403,44 @@ class GameCthulhu(AvailableGame):
 		else:
 			extra_roles_count = 1
 			cultist_count_text = str(max(cultist_count - 1, 0)) + " or " + str(cultist_count)
+		return cultist_count, extra_roles_count, cultist_count_text
+
+	def base_command(self):
+		return self.start_game_command
+
+	def game_commands(self):
+		return self.investigate_commands
+
+	async def share_rules(self, channel):
+		await channel.send(self.rules)
+
+	async def start_new_game(self, base_command, message):
+		if base_command != self.start_game_command:
+			return None
+
+		contents = message.content.split(" ")
+		players_count = len(message.mentions)
+		if players_count < 3:
+			await message.channel.send(self.game_title + " needs at least 3 @players to start")
+			return True
+		for player in message.mentions:
+			if player.bot:
+				await message.channel.send(player.mention + " is a bot and cannot play")
+				return True
+
+		cultist_count, extra_roles_count, cultist_count_text = self.role_counts(players_count)
 
 		await message.channel.send(
 			f"Beginning a(n) {players_count}-player game of {self.game_title} with {cultist_count_text}" +
 			f" {self.cultist_plural_casual}.")
 
 		instance = GameCthulhuInstance(self, message.channel, message.mentions, cultist_count, extra_roles_count)
-		if self.reskin_instance:
-			self.reskin_instance(instance)
 		await instance.start_game()
 		return instance
 
+	async def restore_game(self, snapshot, channel, fetch_player):
+		return await GameCthulhuInstance.restore(self, channel, snapshot, fetch_player)
+
 	def kitten_reskin(self):
 		self.start_game_command = COMMAND_PREFIX + "kitten"
 		self.game_title = "__Don't Poke the Kitten__"
@@ -314,11 +465,13 @@ class GameCthulhu(AvailableGame):
 		self.card_plural = "actions"
 		self.hand_description = "how your kitten will act this round"
 		self.investigate_commands = [COMMAND_PREFIX + "to", COMMAND_PREFIX + "pet", COMMAND_PREFIX + "poke"]
-		def reskin_to_kitten(instance):
-			instance.investigate_verb = "pet/poke"
-			instance.text_a_player = "a kitten"
-			instance.text_one_player = "the kitten of one `@player`"
-			instance.text_yourself = "your kitten"
-			instance.text_you_found = "Their kitten"
-		self.reskin_instance = reskin_to_kitten
+		self.investigate_verb = "pet/poke"
+		self.text_a_player = "a kitten"
+		self.text_one_player = "the kitten of one `@player`"
+		self.text_yourself = "your kitten"
+		self.text_you_found = "Their kitten"
+		self.compile_texts()
 		return self
+
+def kitten_game():
+	return GameCthulhu().kitten_reskin()
@@ -0,0 +1,181 @@
+import importlib.util
+import os
+import sys
+import time
+
+from game_cthulhu import TOTAL_ROUNDS, GameCthulhu
+
+#the bot's secrets.py shadows the standard library module of the same name, which numpy.random imports, and the bot's
+#	modules may have imported it already; so NumPy is imported with the standard library's module, loaded from its own
+#	file, standing in for whatever secrets module there is, which is put back after (numpy.random is imported up front,
+#	NumPy would otherwise load it on first use)
+def import_numpy():
+	spec = importlib.util.spec_from_file_location("secrets", os.path.join(os.path.dirname(os.__file__), "secrets.py"))
+	standard_secrets = importlib.util.module_from_spec(spec)
+	spec.loader.exec_module(standard_secrets)
+	secrets_module = sys.modules.get("secrets")
+	sys.modules["secrets"] = standard_secrets
+	try:
+		import numpy.random
+	finally:
+		if secrets_module is None:
+			del sys.modules["secrets"]
+		else:
+			sys.modules["secrets"] = secrets_module
+	return numpy
+
+np = import_numpy()
+
+#plays many games of Don't Mess with Cthulhu at once with NumPy, one row per game, to measure how often each side wins
+#this is an offline tool, the bot itself doesn't need NumPy
+
+BATCH_SIZE = 100000
+
+#hands are tracked as how many hidden cards each player has, how many of those are Elder Signs, and which player was
+#	dealt Cthulhu; since hands are dealt at random and flips pick a random hidden card, this plays out the same as
+#	dealing real hands
+#strategies that don't look at hands skip dealing entirely: every card that hasn't been flipped is equally likely to be
+#	any of the cards left in the deck, so a flip from any hand is the same as drawing from what's left of the deck (this
+#	also means that without any information about hands, who gets picked doesn't change who wins)
+
+def eligible_targets(hidden, current):
+	eligible = hidden > 0
+	eligible[np.arange(len(current)), current] = False
+	return eligible
+
+#each strategy returns the player that the current player of every game picks, out of the other players with cards left
+def choose_random(rng, hidden, hidden_elder_signs, cthulhu_holder, is_cultist, current):
+	players_count = hidden.shape[1]
+	hidden = hidden.reshape(-1)
+	game_offsets = np.arange(0, len(hidden), players_count)
+	target = (current + rng.integers(1, players_count, len(current))) % players_count
+	#there's always some other player with cards left, so redraw until every game found one
+	retry_games = np.flatnonzero(hidden[game_offsets + target] == 0)
+	while len(retry_games):
+		target[retry_games] = (current[retry_games] + rng.integers(1, players_count, len(retry_games))) % players_count
+		retry_games = retry_games[hidden[game_offsets[retry_games] + target[retry_games]] == 0]
+	return target
+
+#everyone knows every hand: investigators pick hands with Elder Signs and without Cthulhu, cultists pick Cthulhu
+def choose_perfect_information(rng, hidden, hidden_elder_signs, cthulhu_holder, is_cultist, current):
+	eligible = eligible_targets(hidden, current)
+	has_cthulhu = np.arange(hidden.shape[1]) == cthulhu_holder[:, None]
+	current_is_cultist = is_cultist[np.arange(len(current)), current][:, None]
+	preference = np.where(current_is_cultist, has_cthulhu * 2, (hidden_elder_signs > 0) * 1 - has_cthulhu * 2)
+	return np.where(eligible, preference + rng.random(eligible.shape), -np.inf).argmax(axis=1)
+
+#name -> (choose target function, whether it looks at hands)
+STRATEGIES = {
+	"random": (choose_random, False),
+	"perfect_information": (choose_perfect_information, True),
+}
+
+#returns, per game: whether the investigators won, and how many cultists there were
+def simulate_batch(rng, game_count, players_count, cultist_count, extra_roles_count, strategy):
+	choose_target, knows_hands = strategy
+	#deal roles the same way as GameCthulhuInstance: cultist_count of the players_count + extra_roles_count roles are
+	#	cultists, and the extra roles go unused
+	role_order = rng.random((game_count, players_count + extra_roles_count)).argsort(axis=1)
+	all_is_cultist = role_order[:, :players_count] < cultist_count
+	investigators_won = np.zeros(game_count, dtype=bool)
+
+	#games that haven't ended yet, and their state
+	playing_games = np.arange(game_count)
+	is_cultist = all_is_cultist
+	current = rng.integers(0, players_count, game_count)
+	elder_signs_found = np.zeros(game_count, dtype=np.int64)
+	for current_round in range(1, TOTAL_ROUNDS + 1):
+		game_count = len(playing_games)
+		game_offsets = np.arange(0, game_count * players_count, players_count)
+		cards_per_hand = TOTAL_ROUNDS + 2 - current_round
+		hidden = np.full((game_count, players_count), cards_per_hand, dtype=np.int16)
+		#flat views, for quicker lookups of one player per game
+		flat_hidden = hidden.reshape(-1)
+		deck_cards = np.full(game_count, players_count * cards_per_hand)
+		deck_elder_signs = players_count - elder_signs_found
+		hidden_elder_signs = None
+		cthulhu_holder = None
+		if knows_hands:
+			#Cthulhu goes to a random player, then Elder Signs are dealt into the remaining slots one hand at a time
+			cthulhu_holder = rng.integers(0, players_count, game_count)
+			hidden_elder_signs = np.empty((game_count, players_count), dtype=np.int16)
+			elder_signs_left = deck_elder_signs.copy()
+			slots_left = deck_cards - 1
+			for player in range(0, players_count - 1):
+				hand_slots = cards_per_hand - (cthulhu_holder == player)
+				hidden_elder_signs[:, player] = \
+					rng.hypergeometric(elder_signs_left, slots_left - elder_signs_left, hand_slots)
+				elder_signs_left -= hidden_elder_signs[:, player]
+				slots_left -= hand_slots
+			hidden_elder_signs[:, players_count - 1] = elder_signs_left
+			flat_hidden_elder_signs = hidden_elder_signs.reshape(-1)
+		playing = np.ones(game_count, dtype=bool)
+
+		for _ in range(0, players_count):
+			target = choose_target(rng, hidden, hidden_elder_signs, cthulhu_holder, is_cultist, current)
+			target_i = game_offsets + target
+			#flip a random card out of the ones that could be there: Cthulhu, then Elder Signs, then blanks
+			if knows_hands:
+				flip_cards = flat_hidden[target_i]
+				flip_elder_signs = flat_hidden_elder_signs[target_i]
+				flip_cthulhu = cthulhu_holder == target
+			else:
+				#Cthulhu hasn't been flipped in any game that's still going
+				flip_cards = deck_cards
+				flip_elder_signs = deck_elder_signs
+				flip_cthulhu = True
+			flip = rng.random(game_count) * flip_cards
+			found_cthulhu = playing & flip_cthulhu & (flip < 1)
+			found_elder_sign = playing & ~found_cthulhu & (flip < flip_elder_signs + flip_cthulhu)
+			flat_hidden[target_i] -= playing
+			if knows_hands:
+				flat_hidden_elder_signs[target_i] -= found_elder_sign
+			deck_cards = deck_cards - playing
+			deck_elder_signs = deck_elder_signs - found_elder_sign
+			current = np.where(playing, target, current)
+			elder_signs_found += found_elder_sign
+			investigators_won[playing_games] |= playing & (elder_signs_found == players_count)
+			playing &= ~found_cthulhu & (elder_signs_found < players_count)
+
+		playing_games = playing_games[playing]
+		if not len(playing_games):
+			break
+		is_cultist = is_cultist[playing]
+		current = current[playing]
+		elder_signs_found = elder_signs_found[playing]
+
+	return investigators_won, all_is_cultist.sum(axis=1)
+
+def simulate(game_count, players_count, strategy = "random", extra_roles_count = None, seed = None):
+	rng = np.random.default_rng(seed)
+	cultist_count, default_extra_roles_count, _ = GameCthulhu.role_counts(players_count)
+	if extra_roles_count is None:
+		extra_roles_count = default_extra_roles_count
+	investigator_wins = 0
+	cultists_total = 0
+	for batch_start in range(0, game_count, BATCH_SIZE):
+		investigators_won, cultists = simulate_batch(
+			rng,
+			min(BATCH_SIZE, game_count - batch_start),
+			players_count,
+			cultist_count,
+			extra_roles_count,
+			STRATEGIES[strategy])
+		investigator_wins += investigators_won.sum()
+		cultists_total += cultists.sum()
+	return investigator_wins / game_count, cultists_total / game_count
+
+#usage: game_cthulhu_sim.py [games per player count] [strategy] [extra roles count]
+if __name__ == "__main__":
+	game_count = int(sys.argv[1]) if len(sys.argv) >= 2 else 1000000
+	strategy = sys.argv[2] if len(sys.argv) >= 3 else "random"
+	extra_roles_count = int(sys.argv[3]) if len(sys.argv) >= 4 else None
+	print(f"{game_count} games per player count, {strategy} strategy")
+	print("players  extra roles  avg cultists  investigators win  cultists win")
+	for players_count in range(3, 21):
+		start = time.perf_counter()
+		investigator_win_rate, average_cultists = simulate(game_count, players_count, strategy, extra_roles_count)
+		shown_extra_roles = GameCthulhu.role_counts(players_count)[1] if extra_roles_count is None else extra_roles_count
+		print(f"{players_count:7}  {shown_extra_roles:11}  {average_cultists:12.2f}" +
+			f"  {investigator_win_rate:17.2%}  {1 - investigator_win_rate:12.2%}" +
+			f"  ({time.perf_counter() - start:.2f}s)")
@@ -0,0 +1,36 @@
+#games append compact binary records of what happened to their event log, so that a game can be replayed later;
+#	each record is an event type byte, a two-byte payload length, and a payload of small numbers like player indices
+
+#game command, then the game's seed and whatever else it needs to set itself up
+EVENT_START = 1
+#cards dealt to every player, in player order
+EVENT_DEAL = 2
+#index of the investigating player, index of the investigated player
+EVENT_INVESTIGATE = 3
+#whether heads was guessed, whether the coin came up heads
+EVENT_GUESS = 4
+#whether the good side won
+EVENT_END = 5
+
+def record_event(events, event_type, payload):
+	events.append(event_type)
+	events += len(payload).to_bytes(2, "little")
+	events += payload
+
+def record_start(events, game_command, payload):
+	command = game_command.encode()
+	record_event(events, EVENT_START, bytes([len(command)]) + command + bytes(payload))
+
+#split a START payload into the game command and the rest of the payload
+def read_start(payload):
+	return payload[1:payload[0] + 1].decode(), payload[payload[0] + 1:]
+
+#(event type, payload) for every record in an event log
+def read_events(events):
+	records = []
+	i = 0
+	while i < len(events):
+		payload_end = i + 3 + int.from_bytes(events[i + 1:i + 3], "little")
+		records.append((events[i], bytes(events[i + 3:payload_end])))
+		i = payload_end
+	return records
@@ -0,0 +1,44 @@
+import asyncio
+import collections
+
+MAILBOX_SIZE = 20
+
+#runs the jobs sent to each channel one at a time, in the order they were sent, while different channels run
+#	concurrently; a channel only has a task while it has jobs to run
+class ChannelActors:
+	def __init__(self, on_error):
+		#called with the channel id and the exception when a job raises
+		self.on_error = on_error
+		#channel id -> (job, future) pairs, starting with the job that's running
+		self.mailboxes = {}
+		self.tasks = {}
+		self.dropped = 0
+
+	#queue a coroutine function to run after the channel's earlier jobs, and return a future for its result; bounded
+	#	jobs are dropped, returning None, when the channel already has MAILBOX_SIZE jobs waiting
+	def submit(self, channel_id, job, bounded = True):
+		mailbox = self.mailboxes.get(channel_id)
+		if mailbox is None:
+			mailbox = self.mailboxes[channel_id] = collections.deque()
+			self.tasks[channel_id] = asyncio.create_task(self.run(channel_id, mailbox))
+		elif bounded and len(mailbox) >= MAILBOX_SIZE:
+			self.dropped += 1
+			return None
+		future = asyncio.get_running_loop().create_future()
+		mailbox.append((job, future))
+		return future
+
+	async def run(self, channel_id, mailbox):
+		while mailbox:
+			job, future = mailbox[0]
+			try:
+				result = await job()
+			except Exception as exception:
+				self.on_error(channel_id, exception)
+				result = None
+			mailbox.popleft()
+			#whoever was waiting for the result may have been cancelled
+			if not future.done():
+				future.set_result(result)
+		del self.mailboxes[channel_id]
+		del self.tasks[channel_id]
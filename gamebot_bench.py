@@ -0,0 +1,543 @@
+import asyncio
+import concurrent.futures
+import discord
+import io
+import os
+import random
+import subprocess
+import tempfile
+import tracemalloc
+import sys
+import time
+
+from game_common import ActiveGame, AvailableGame, COMMAND_PREFIX
+from game_cthulhu import GameCthulhu, GameCthulhuInstance, PAGED_BOARD_PLAYERS
+from gamebot_fakes import FakeChannel, FakeGuild, FakeUser, choose_investigation_target, next_id
+from gamebot_loadtest import FakeGateway
+from gamebot_log import LogWriter
+from gamebot_main import GameClient, IDLE_CHECK_INTERVAL, default_games
+from gamebot_profiler import PROFILE_MAX_WINDOW
+from gamebot_router import CommandRouter
+from gamebot_snapshot import SnapshotStore
+from gamebot_supervisor import shard_for_guild
+
+async def measure_async(iterations, run):
+	start = time.perf_counter()
+	for _ in range(0, iterations):
+		await run()
+	return (time.perf_counter() - start) / iterations
+
+def measure_sync(iterations, run):
+	start = time.perf_counter()
+	for _ in range(0, iterations):
+		run()
+	return (time.perf_counter() - start) / iterations
+
+def report(name, seconds):
+	print(f"{name:<48} {seconds * 1e3:12.4f} ms")
+
+class BenchGame(AvailableGame):
+	def __init__(self, number):
+		self.command = COMMAND_PREFIX + "game" + str(number)
+
+	def base_command(self):
+		return self.command
+
+	def game_commands(self):
+		return [self.command + "move"]
+
+	async def start_new_game(self, base_command, message):
+		if base_command != self.command:
+			return None
+		return True
+
+async def bench_dispatch():
+	for game_count in [3, 10, 50, 100]:
+		games = [BenchGame(number) for number in range(0, game_count)]
+		router = CommandRouter(games)
+		base_command = games[-1].base_command()
+
+		async def linear_scan():
+			for game in games:
+				if await game.start_new_game(base_command, None):
+					return
+
+		async def routed():
+			await router.find_game(base_command).start_new_game(base_command, None)
+
+		report(f"dispatch linear scan, {game_count} games", await measure_async(10000, linear_scan))
+		report(f"dispatch router, {game_count} games", await measure_async(10000, routed))
+
+#play out a game where every player investigates a random other player, and return how many turns were taken
+async def play_cthulhu_game(instance, channel):
+	await instance.start_game()
+	turns = 0
+	while True:
+		turns += 1
+		target = choose_investigation_target(instance)
+		message = channel.receive("!to " + target.mention, instance.next_player, [target])
+		if not await instance.handle_public_message("!to", message):
+			return turns
+
+async def bench_dm_fanout():
+	latency = 0.05
+	for player_count in [3, 10, 20]:
+		players = [FakeUser(str(number), latency) for number in range(0, player_count)]
+
+		async def serial_sends():
+			for player in players:
+				await player.send("")
+
+		async def fanout_sends():
+			await ActiveGame.send_private_messages([(player, "") for player in players])
+
+		async def start_game():
+			instance = GameCthulhuInstance(GameCthulhu(), FakeChannel(latency=latency), players, 2, 1)
+			await instance.start_game()
+
+		report(f"DMs serial, {player_count} players", await measure_async(3, serial_sends))
+		report(f"DMs fan-out, {player_count} players", await measure_async(3, fanout_sends))
+		report(f"start_game with fan-out, {player_count} players", await measure_async(3, start_game))
+
+async def bench_board_api_calls():
+	available_game = GameCthulhu()
+	for player_count in [3, 10, 20, 30, 60]:
+		for paged in [False, True] if player_count > PAGED_BOARD_PLAYERS else [False]:
+			total_turns = 0
+			total_api_calls = 0
+			sent_characters = 0
+			longest_message = 0
+			for _ in range(0, 100):
+				players = [FakeUser(str(number), 0) for number in range(0, player_count)]
+				#real user ids are 18-19 digits long
+				for player in players:
+					player.mention = f"<@{10 ** 18 + player.id}>"
+				channel = FakeChannel()
+				instance = GameCthulhuInstance(available_game, channel, players, 2, 1)
+				if not paged:
+					instance.board_pages = None
+				total_turns += await play_cthulhu_game(instance, channel)
+				total_api_calls += channel.api_calls
+				sent_characters += channel.sent_characters
+				longest_message = max(longest_message, channel.longest_message)
+			print(f"per turn, {player_count} players{', paged' if paged else ''}:" +
+				f" {total_api_calls / total_turns:.2f} channel API calls, {sent_characters / total_turns:.0f} characters;" +
+				f" longest message: {longest_message} characters")
+
+async def bench_snapshots():
+	game_count = 5000
+	available_game = GameCthulhu()
+	players_by_id = {}
+	store = SnapshotStore(tempfile.mkdtemp(), LogWriter(None))
+	originals = {}
+	for channel_id in range(0, game_count):
+		players = [FakeUser(str(number), 0) for number in range(0, 5)]
+		players_by_id.update((player.id, player) for player in players)
+		channel = FakeChannel()
+		instance = GameCthulhuInstance(available_game, channel, players, 2, 1)
+		await instance.start_game()
+		#games saved at different points of their first rounds; those that already ended are never saved
+		for _ in range(0, channel_id % 8):
+			target = choose_investigation_target(instance)
+			if not await instance.handle_public_message(
+					"!to", channel.receive("!to " + target.mention, instance.next_player, [target])):
+				break
+		else:
+			instance.available_game = available_game
+			store.mark_dirty(channel_id, instance)
+			originals[channel_id] = instance
+
+	async def fetch_player(player_id):
+		return players_by_id[player_id]
+
+	start = time.perf_counter()
+	await store.flush()
+	report(f"snapshot {len(originals)} games", time.perf_counter() - start)
+	start = time.perf_counter()
+	restored_games = {}
+	for channel_id in await store.list_channels():
+		snapshot = await store.load(channel_id)
+		restored_games[channel_id] = await available_game.restore_game(snapshot["state"], FakeChannel(), fetch_player)
+	report(f"restore {len(originals)} games", time.perf_counter() - start)
+
+	#a restored game has to be the game that was saved, and go on the same way when the same moves are made in both
+	mismatched = 0
+	for channel_id, original in originals.items():
+		restored = restored_games.get(channel_id)
+		if not restored or restored.to_snapshot() != original.to_snapshot():
+			mismatched += 1
+			continue
+		for _ in range(0, 3):
+			target = choose_investigation_target(original)
+			still_going = [
+				await instance.handle_public_message(
+					"!to", instance.channel.receive("!to " + target.mention, instance.next_player, [target]))
+				for instance in [original, restored]]
+			if not all(still_going):
+				break
+		mismatched += restored.events != original.events
+	print(f"restored games that differ from the saved ones: {mismatched} of {len(originals)}")
+	assert mismatched == 0
+
+#start a game in every guild through a GameClient running one shard, with a fake gateway that only delivers the events
+#	of that shard's guilds, check that the client ends up with exactly those games, and play them out; returns the
+#	turns played and how many games were missing or didn't belong to the shard
+def run_shard_games(shard_id, shard_count, guild_ids):
+	async def play_shard_games():
+		client = GameClient(games=default_games(), shard_count=shard_count, shard_ids=[shard_id])
+		client.snapshots.directory = tempfile.mkdtemp()
+		gateway = FakeGateway(client)
+		channels = {}
+		for guild_id in guild_ids:
+			guild = FakeGuild(str(guild_id))
+			guild.id = guild_id
+			channel = FakeChannel(guild)
+			players = [FakeUser(str(number)) for number in range(0, 10)]
+			mentions = " ".join(player.mention for player in players)
+			if await gateway.deliver(channel, "!cthulhu " + mentions, players[0], players):
+				channels[channel.id] = channel
+		misplaced_games = len(channels.keys() ^ client.active_games.keys())
+		misplaced_games += sum(
+			1 for channel in channels.values() if shard_for_guild(channel.guild.id, shard_count) != shard_id)
+		turns = 0
+		for channel in channels.values():
+			game = client.active_games.get(channel.id)
+			while game and client.active_games.get(channel.id) is game:
+				turns += 1
+				target = choose_investigation_target(game)
+				await gateway.deliver(channel, "!to " + target.mention, game.next_player, [target])
+		return turns, misplaced_games
+
+	return asyncio.run(play_shard_games())
+
+def bench_sharded_throughput():
+	guild_ids = [guild_number << 22 for guild_number in range(1, 4001)]
+	for shard_count in [1, 2, 4]:
+		start = time.perf_counter()
+		with concurrent.futures.ProcessPoolExecutor(shard_count) as executor:
+			results = list(executor.map(
+				run_shard_games, range(0, shard_count), [shard_count] * shard_count, [guild_ids] * shard_count))
+		elapsed = time.perf_counter() - start
+		turns = sum(shard_turns for shard_turns, _ in results)
+		misplaced_games = sum(shard_misplaced_games for _, shard_misplaced_games in results)
+		print(f"sharded turns/sec, {shard_count} shard processes: {turns / elapsed:.0f}," +
+			f" games missing or on the wrong shard: {misplaced_games}")
+
+async def bench_game_memory():
+	game_count = 10000
+	available_game = GameCthulhu()
+	game_players = [[FakeUser(str(number)) for number in range(0, 6)] for _ in range(0, game_count)]
+	channels = [FakeChannel() for _ in range(0, game_count)]
+	tracemalloc.start()
+	start_memory = tracemalloc.get_traced_memory()[0]
+	games = []
+	for players, channel in zip(game_players, channels):
+		instance = GameCthulhuInstance(available_game, channel, players, 2, 0)
+		await instance.start_game()
+		games.append(instance)
+	game_memory = tracemalloc.get_traced_memory()[0] - start_memory
+	tracemalloc.stop()
+	print(f"memory per 6-player game, {game_count} games loaded: {game_memory / game_count:.0f} bytes")
+
+async def bench_render():
+	available_game = GameCthulhu()
+	for player_count in [3, 10, 20]:
+		players = [FakeUser(str(number)) for number in range(0, player_count)]
+		channel = FakeChannel()
+		instance = GameCthulhuInstance(available_game, channel, players, 2, 1)
+		await instance.start_game()
+		target = choose_investigation_target(instance)
+		await instance.handle_public_message("!to", channel.receive("!to " + target.mention, instance.next_player, [target]))
+		report(f"post_game_state, {player_count} players", await measure_async(2000, lambda: instance.post_game_state(None)))
+	report("share_rules", await measure_async(2000, lambda: available_game.share_rules(channel)))
+
+#start games that are abandoned after one move, hour after hour, and check that idle eviction keeps memory flat
+async def bench_idle_eviction():
+	client = GameClient(games=default_games())
+	client.snapshots.directory = tempfile.mkdtemp()
+	client.events.directory = tempfile.mkdtemp()
+	client.log.path = os.path.join(tempfile.mkdtemp(), "gamebot.jsonl")
+	client.log.start()
+	gateway = FakeGateway(client)
+	guild = FakeGuild("soak")
+	games_per_hour = 50
+	tracemalloc.start()
+	for hour in range(0, 14 * 24):
+		for _ in range(0, games_per_hour):
+			players = [FakeUser(str(number)) for number in range(0, 6)]
+			channel = FakeChannel()
+			channel.guild = guild
+			await gateway.deliver(channel, "!cthulhu " + " ".join(player.mention for player in players), players[0], players)
+			game = client.active_games[channel.id]
+			target = choose_investigation_target(game)
+			await gateway.deliver(channel, "!to " + target.mention, game.next_player, [target])
+		idle_games = len(client.active_games)
+		for _ in range(0, 3600 // IDLE_CHECK_INTERVAL):
+			for channel in client.idle_games.advance():
+				await client.conclude_idle_game(channel, client.active_games.get(channel.id))
+		await client.snapshots.flush()
+		await client.events.flush()
+		gateway.latencies.clear()
+		if hour == 0 or hour % 24 == 23:
+			print(f"idle eviction soak, hour {hour + 1:3}: {idle_games} idle games, {len(client.active_games)} left," +
+				f" {tracemalloc.get_traced_memory()[0] / 1024:8.0f} KiB")
+	tracemalloc.stop()
+	client.log.stop()
+
+#a log sink that takes a millisecond per write, like a slow pipe or a file on network storage
+class ThrottledStream(io.StringIO):
+	def write(self, text):
+		time.sleep(0.001)
+		return super().write(text)
+
+#a log writer whose every batch takes 50ms to write
+class ThrottledLogWriter(LogWriter):
+	def write_lines(self, lines):
+		time.sleep(0.05)
+
+async def bench_log_backpressure():
+	message_count = 20000
+	client = GameClient(games=default_games())
+	client.snapshots.directory = tempfile.mkdtemp()
+	gateway = FakeGateway(client)
+	channel = FakeChannel()
+	channel.guild = FakeGuild("logging")
+	player = FakeUser("player")
+	stream = ThrottledStream()
+
+	async def print_to_sink():
+		await gateway.deliver(channel, "!coin heads", player)
+		print(f"{channel.id}: {player.id} !coin heads", file=stream)
+
+	report("handler, print to a throttled sink", await measure_async(200, print_to_sink))
+	client.log = ThrottledLogWriter(None, queue_size=1000)
+	client.log.start()
+
+	async def log_to_sink():
+		await gateway.deliver(channel, "!coin heads", player)
+
+	report("handler, log to a throttled sink", await measure_async(message_count, log_to_sink))
+	client.log.stop()
+	print(f"log records written: {client.log.written}, dropped: {client.log.dropped}")
+
+#what importing the bot costs, from python -X importtime, and what building its games costs before and after they're
+#	first used
+def bench_startup():
+	result = subprocess.run(
+		[sys.executable, "-X", "importtime", "-c", "import gamebot_main; gamebot_main.default_games()"],
+		capture_output=True,
+		text=True)
+	import_times = {}
+	for line in result.stderr.splitlines():
+		fields = line.split("|")
+		if len(fields) == 3 and fields[1].strip().isdigit():
+			import_times[fields[2].strip()] = int(fields[1])
+	for module in ["gamebot_main", "discord", "gamebot_plugins", "game_cthulhu", "game_coin"]:
+		if module in import_times:
+			print(f"import {module:<41} {import_times[module] / 1e3:12.4f} ms")
+		else:
+			print(f"import {module:<41} {'not imported':>15}")
+	report("default_games, lazy", measure_sync(100, default_games))
+	report("default_games, loaded", measure_sync(100, lambda: [game.load() for game in default_games()]))
+
+#what on_ready did on every reconnect before channels were tracked incrementally
+def rescan_channels(guilds, last_known_channels):
+	changed_channels = {}
+	for guild in guilds:
+		old_channels = last_known_channels.get(guild, set())
+		new_channels = {channel for channel in guild.channels if isinstance(channel, discord.TextChannel)}
+		last_known_channels[guild] = new_channels
+		if new_channels != old_channels:
+			changed_channels[guild] = (new_channels - old_channels, old_channels - new_channels)
+	return changed_channels
+
+def fake_text_channel(guild):
+	#the client only tracks real TextChannels, so skip the constructor and fill in what it looks at
+	channel = discord.TextChannel.__new__(discord.TextChannel)
+	#channels hash by id >> 22, so ids need to look like real snowflakes
+	channel.id = next_id() << 22
+	channel.name = "channel-" + str(channel.id)
+	channel.guild = guild
+	guild.channels.append(channel)
+	return channel
+
+async def bench_channel_tracking():
+	client = GameClient(games=default_games())
+	guilds = [FakeGuild(f"guild {number}") for number in range(0, 5000)]
+	for guild in guilds:
+		for _ in range(0, 50):
+			fake_text_channel(guild)
+	client._connection._guilds = {guild.id: guild for guild in guilds}
+	start = time.perf_counter()
+	await client.on_ready()
+	report("first on_ready, 5000 guilds x 50 channels", time.perf_counter() - start)
+	last_known_channels = {}
+	rescan_channels(guilds, last_known_channels)
+	start = time.perf_counter()
+	rescan_channels(guilds, last_known_channels)
+	report("reconnect with full rescan", time.perf_counter() - start)
+	report("reconnect with incremental tracking", await measure_async(10, client.on_ready))
+	channel = fake_text_channel(guilds[0])
+	report("channel create and delete events", await measure_async(1, lambda: client.on_guild_channel_create(channel)) +
+		await measure_async(1, lambda: client.on_guild_channel_delete(channel)))
+
+#how hands were dealt before games had their own generators, one draw from the global generator per card
+def draw_hands_per_card(hand_count, cards_per_hand, deck):
+	deck = list(deck)
+	hands = []
+	for _ in range(0, hand_count):
+		hand = []
+		for _ in range(0, cards_per_hand):
+			card_i = int(random.random() * len(deck))
+			card = deck[card_i]
+			last_card = deck.pop()
+			if card_i < len(deck):
+				deck[card_i] = last_card
+			hand.append(card)
+		hands.append(bytearray(hand))
+	return hands
+
+async def bench_dealing():
+	available_game = GameCthulhu()
+	for player_count in [5, 10, 30]:
+		players = [FakeUser(str(number)) for number in range(0, player_count)]
+		instance = GameCthulhuInstance(available_game, FakeChannel(), players, 2, 1)
+		instance.current_round = 1
+		deck = bytearray(range(0, 3)) * (player_count * 5 // 3 + 1)
+		deck = deck[:player_count * 5]
+		report(f"deal 5 cards, {player_count} players, per card",
+			measure_sync(2000, lambda: draw_hands_per_card(player_count, 5, deck)))
+		report(f"deal 5 cards, {player_count} players, one shuffle",
+			measure_sync(2000, lambda: instance.deal_hands(5, bytearray(deck))))
+
+def resident_kib():
+	with open("/proc/self/status", encoding="utf-8") as file:
+		return next(int(line.split()[1]) for line in file if line.startswith("VmRSS:"))
+
+def gateway_member(user):
+	return {"user": user, "roles": [], "joined_at": "2020-01-01T00:00:00+00:00", "deaf": False, "mute": False, "flags": 0}
+
+#how much resident memory each guild costs a client, from the GUILD_CREATE payloads and message events the gateway
+#	would send it: every guild has text channels and a few members in voice, and a few people chatting
+async def measure_gateway_memory(lean_gateway, guild_count, channel_count, chatter_count):
+	client = GameClient(games=default_games(), lean_gateway=lean_gateway)
+	#what login would set up, so that events can be dispatched
+	await client._async_setup_hook()
+	state = client._connection
+	state.user = discord.ClientUser(state=state, data={"id": "1", "username": "gamebot", "discriminator": "0", "avatar": None})
+	start_memory = resident_kib()
+	for guild_number in range(1, guild_count + 1):
+		guild_id = guild_number << 22
+		users = [
+			{"id": str((guild_id + number) << 22), "username": f"user {number}", "discriminator": "0", "avatar": None}
+			for number in range(1, chatter_count + 1)]
+		voice_users = users[:5]
+		guild = state._add_guild_from_data({
+			"id": str(guild_id),
+			"name": f"guild {guild_number}",
+			"owner_id": users[0]["id"],
+			"roles": [{"id": str(guild_id), "name": "@everyone", "permissions": "0", "position": 0}],
+			"channels": [
+				{"id": str(guild_id + number), "type": 0, "name": f"channel {number}", "position": number}
+				for number in range(1, channel_count + 1)],
+			"members": [gateway_member(user) for user in voice_users],
+			"voice_states": [
+				{"user_id": user["id"], "channel_id": str(guild_id + 1), "session_id": "session", "member": gateway_member(user)}
+				for user in voice_users],
+			"member_count": 1000,
+			"large": True,
+		})
+		await client.on_guild_join(guild)
+		for user in users:
+			member = gateway_member(user)
+			del member["user"]
+			state.parse_message_create({
+				"id": str(next_id() << 22),
+				"channel_id": str(guild_id + 1),
+				"guild_id": str(guild_id),
+				"author": user,
+				"member": member,
+				"content": "anyone up for a game?",
+				"timestamp": "2020-01-01T00:00:00+00:00",
+				"type": 0,
+			})
+		#let the on_message handlers run
+		await asyncio.sleep(0)
+	return (resident_kib() - start_memory) / guild_count
+
+#runs each profile in its own process, so that memory one of them freed and kept doesn't count towards the other
+def bench_gateway_memory():
+	guild_count = 2000
+	for lean_gateway in [False, True]:
+		result = subprocess.run(
+			[sys.executable, "-c",
+				"import asyncio, gamebot_bench\n"
+				f"print(asyncio.run(gamebot_bench.measure_gateway_memory({lean_gateway}, {guild_count}, 20, 20)))"],
+			capture_output=True,
+			text=True,
+			check=True)
+		profile = "lean" if lean_gateway else "default"
+		print(f"resident memory per guild, {profile} gateway, {guild_count} guilds: "
+			f"{float(result.stdout.splitlines()[-1]):.2f} KiB")
+
+#what sampling the event loop costs a burst of games, and what the profile says the games spent their time on
+async def bench_profiler_overhead():
+	client = GameClient(games=default_games())
+	client.snapshots.directory = tempfile.mkdtemp()
+	client.profiler.directory = tempfile.mkdtemp()
+	gateway = FakeGateway(client)
+	guild = FakeGuild("profiling")
+
+	async def play_game():
+		players = [FakeUser(str(number)) for number in range(0, 10)]
+		channel = FakeChannel()
+		channel.guild = guild
+		await gateway.deliver(channel, "!cthulhu " + " ".join(player.mention for player in players), players[0], players)
+		game = client.active_games.get(channel.id)
+		while game and client.active_games.get(channel.id) is game:
+			target = choose_investigation_target(game)
+			await gateway.deliver(channel, "!to " + target.mention, game.next_player, [target])
+
+	report("10-player game, not profiling", await measure_async(1000, play_game))
+	path = client.profiler.start(PROFILE_MAX_WINDOW)
+	report("10-player game, profiling", await measure_async(1000, play_game))
+	client.profiler.stop()
+	client.profiler.join()
+	#samples per function, counting each function once per stack it's in
+	function_samples = {}
+	sample_count = 0
+	with open(path, encoding="utf-8") as file:
+		for line in file:
+			stack, count = line.rsplit(" ", 1)
+			sample_count += int(count)
+			for name in set(stack.split(";")):
+				function_samples[name] = function_samples.get(name, 0) + int(count)
+	print(f"profile: {sample_count} samples")
+	for name, count in sorted(function_samples.items(), key=lambda item: -item[1]):
+		if name.startswith("game_"):
+			print(f"    {name:<60} {count / sample_count:6.1%}")
+
+BENCHMARKS = {
+	"dispatch": bench_dispatch,
+	"dm_fanout": bench_dm_fanout,
+	"board_api_calls": bench_board_api_calls,
+	"snapshots": bench_snapshots,
+	"sharded_throughput": bench_sharded_throughput,
+	"game_memory": bench_game_memory,
+	"render": bench_render,
+	"idle_eviction": bench_idle_eviction,
+	"log_backpressure": bench_log_backpressure,
+	"startup": bench_startup,
+	"channel_tracking": bench_channel_tracking,
+	"dealing": bench_dealing,
+	"gateway_memory": bench_gateway_memory,
+	"profiler_overhead": bench_profiler_overhead,
+}
+
+if __name__ == "__main__":
+	for name in sys.argv[1:] or BENCHMARKS.keys():
+		benchmark = BENCHMARKS[name]
+		if asyncio.iscoroutinefunction(benchmark):
+			asyncio.run(benchmark())
+		else:
+			benchmark()
@@ -0,0 +1,52 @@
+import asyncio
+import os
+import time
+
+EVENT_FLUSH_INTERVAL = 10
+
+#appends the event logs of finished games to one file per day, as a 4-byte length followed by the log; like snapshots,
+#	file IO happens on a worker thread
+class EventStore:
+	def __init__(self, directory, log, suffix = ""):
+		self.directory = directory
+		self.log = log
+		#added to file names, so that processes of a sharded bot don't write to the same files
+		self.suffix = suffix
+		self.pending_logs = []
+
+	def append(self, events):
+		if events:
+			self.pending_logs.append(bytes(events))
+
+	async def run(self):
+		while True:
+			await asyncio.sleep(EVENT_FLUSH_INTERVAL)
+			await self.flush()
+
+	async def flush(self):
+		if not self.pending_logs:
+			return
+		pending_logs = self.pending_logs
+		self.pending_logs = []
+		try:
+			await asyncio.get_running_loop().run_in_executor(None, self.write_logs, pending_logs)
+		except OSError as exception:
+			self.log.log("events_failed", games=len(pending_logs), error=str(exception))
+
+	def write_logs(self, logs):
+		os.makedirs(self.directory, exist_ok=True)
+		path = os.path.join(self.directory, time.strftime("%Y-%m-%d") + self.suffix + ".bin")
+		with open(path, "ab") as file:
+			file.write(b"".join(len(events).to_bytes(4, "little") + events for events in logs))
+
+#every game event log in a file written by EventStore
+def read_logs(path):
+	with open(path, "rb") as file:
+		data = file.read()
+	logs = []
+	i = 0
+	while i + 4 <= len(data):
+		log_end = i + 4 + int.from_bytes(data[i:i + 4], "little")
+		logs.append(data[i + 4:log_end])
+		i = log_end
+	return logs
@@ -0,0 +1,91 @@
+import asyncio
+import itertools
+import random
+
+#offline stand-ins for the parts of discord.py that the bot uses, for benchmarks and load tests
+
+next_id = itertools.count(1).__next__
+
+class FakeUser:
+	def __init__(self, name, latency = 0):
+		self.name = name
+		self.id = next_id()
+		self.mention = "<@" + str(self.id) + ">"
+		self.bot = False
+		self.latency = latency
+		self.api_calls = 0
+
+	async def send(self, message):
+		self.api_calls += 1
+		if self.latency:
+			await asyncio.sleep(self.latency)
+
+class FakeMessage:
+	def __init__(self, channel, content, author = None, mentions = None, message_id = None):
+		self.channel = channel
+		self.content = content
+		self.author = author
+		self.mentions = mentions or []
+		self.id = message_id or next_id()
+
+	async def add_reaction(self, emoji):
+		self.channel.reactions += 1
+		await self.channel.api_call()
+
+	async def edit(self, content):
+		await self.channel.api_call()
+		self.content = content
+		self.channel.record_content(content)
+
+	async def delete(self):
+		await self.channel.api_call()
+
+class FakeGuild:
+	def __init__(self, name):
+		self.name = name
+		self.id = next_id() << 22
+		self.channels = []
+
+class FakeChannel:
+	def __init__(self, guild = None, latency = 0):
+		self.guild = guild
+		self.id = next_id()
+		self.name = "channel-" + str(self.id)
+		self.latency = latency
+		self.api_calls = 0
+		self.reactions = 0
+		self.longest_message = 0
+		self.sent_characters = 0
+		self.last_message_id = None
+		if guild:
+			guild.channels.append(self)
+
+	async def api_call(self):
+		self.api_calls += 1
+		if self.latency:
+			await asyncio.sleep(self.latency)
+
+	async def send(self, content):
+		await self.api_call()
+		self.record_content(content)
+		message = FakeMessage(self, content)
+		self.last_message_id = message.id
+		return message
+
+	def record_content(self, content):
+		self.longest_message = max(self.longest_message, len(content))
+		self.sent_characters += len(content)
+
+	def get_partial_message(self, message_id):
+		return FakeMessage(self, None, message_id=message_id)
+
+	#a message from a user arriving in this channel
+	def receive(self, content, author, mentions):
+		message = FakeMessage(self, content, author, mentions)
+		self.last_message_id = message.id
+		return message
+
+#pick a player for the active player of a GameCthulhuInstance to investigate, out of those with cards left to flip
+def choose_investigation_target(instance):
+	return random.choice(
+		[player for player in instance.all_players if player is not instance.next_player and instance.hands[player].hidden > 0])
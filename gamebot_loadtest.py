@@ -0,0 +1,130 @@
+import asyncio
+import random
+import sys
+import time
+
+from game_events import EVENT_INVESTIGATE, read_events
+from gamebot_fakes import FakeChannel, FakeGuild, FakeUser, choose_investigation_target
+from gamebot_main import GameClient, default_games
+from gamebot_replay import replay_log
+from gamebot_supervisor import shard_for_guild
+
+CHANNELS_PER_GUILD = 50
+PLAYERS_PER_GAME = 6
+GAME_COMMANDS = ["!cthulhu", "!kitten", "!coin"]
+
+#feeds fake messages to a GameClient the way the Discord gateway would, timing how long each one takes to handle
+class FakeGateway:
+	def __init__(self, client):
+		self.client = client
+		client._connection.user = FakeUser("gamebot")
+		self.latencies = []
+
+	#whether Discord would send this guild's events to the client, going by the shards it runs
+	def reaches(self, guild):
+		shard_ids = self.client.shard_ids
+		return not shard_ids or shard_for_guild(guild.id, self.client.shard_count) in shard_ids
+
+	#returns whether the message reached the client
+	async def deliver(self, channel, content, author, mentions = ()):
+		if channel.guild and not self.reaches(channel.guild):
+			return False
+		message = channel.receive(content, author, list(mentions))
+		start = time.perf_counter()
+		await self.client.on_message(message)
+		self.latencies.append(time.perf_counter() - start)
+		return True
+
+async def play_game(gateway, channel, game_command, players):
+	if game_command == "!coin":
+		await gateway.deliver(channel, game_command, players[0])
+		await gateway.deliver(channel, "!heads", players[0])
+		return
+	await gateway.deliver(
+		channel, game_command + " " + " ".join(player.mention for player in players), players[0], players)
+	game = gateway.client.active_games.get(channel.id)
+	while gateway.client.active_games.get(channel.id) is game:
+		target = choose_investigation_target(game)
+		await gateway.deliver(channel, "!to " + target.mention, game.next_player, [target])
+
+async def play_channel(gateway, channel, games_per_channel, players):
+	for game_number in range(0, games_per_channel):
+		await play_game(gateway, channel, GAME_COMMANDS[(channel.id + game_number) % len(GAME_COMMANDS)], players)
+
+async def run_load_test(channel_count, games_per_channel, api_latency):
+	gateway = FakeGateway(GameClient(games=default_games()))
+	guilds = [FakeGuild(f"guild {number}") for number in range(0, (channel_count - 1) // CHANNELS_PER_GUILD + 1)]
+	channels = [
+		FakeChannel(guilds[number // CHANNELS_PER_GUILD], api_latency) for number in range(0, channel_count)
+	]
+	channel_players = [
+		[FakeUser(f"player {number}", api_latency) for number in range(0, PLAYERS_PER_GAME)] for _ in channels
+	]
+	start = time.perf_counter()
+	await asyncio.gather(
+		*(play_channel(gateway, channel, games_per_channel, players)
+			for channel, players in zip(channels, channel_players)))
+	elapsed = time.perf_counter() - start
+
+	latencies = sorted(gateway.latencies)
+	api_calls = sum(channel.api_calls for channel in channels)
+	api_calls += sum(player.api_calls for players in channel_players for player in players)
+	print(f"{channel_count} channels x {games_per_channel} games, {api_latency * 1000:g}ms API latency")
+	print(f"    messages/sec: {len(latencies) / elapsed:.0f}")
+	print(f"    handling latency p50: {latencies[len(latencies) // 2] * 1000:.3f}ms" +
+		f", p99: {latencies[len(latencies) * 99 // 100] * 1000:.3f}ms")
+	print(f"    API calls per game: {api_calls / (channel_count * games_per_channel):.1f}")
+
+#every player of every channel's game sends commands at once, including several starts and repeated moves, and every
+#	turn the game took has to show up exactly once, as a reaction and as a record in its event log
+async def run_burst_test(channel_count, bursts, api_latency):
+	client = GameClient(games=default_games())
+	gateway = FakeGateway(client)
+	guild = FakeGuild("burst")
+	channels = [FakeChannel(guild, api_latency) for _ in range(0, channel_count)]
+	channel_players = [[FakeUser(f"player {number}") for number in range(0, PLAYERS_PER_GAME)] for _ in channels]
+	games = {}
+
+	async def start_burst(channel, players):
+		mentions = " ".join(player.mention for player in players)
+		await asyncio.gather(*(gateway.deliver(channel, "!cthulhu " + mentions, player, players) for player in players))
+		games[channel] = client.active_games[channel.id]
+
+	async def move_burst(channel, players):
+		moves = []
+		for player in players:
+			target = random.choice([other_player for other_player in players if other_player is not player])
+			moves += [gateway.deliver(channel, "!to " + target.mention, player, [target])] * 2
+		await asyncio.gather(*moves)
+
+	await asyncio.gather(*(start_burst(channel, players) for channel, players in zip(channels, channel_players)))
+	for _ in range(0, bursts):
+		await asyncio.gather(*(move_burst(channel, players) for channel, players in zip(channels, channel_players)))
+	games_by_command = {game.base_command(): game for game in client.available_games}
+	turns = 0
+	mismatched_channels = 0
+	for channel, game in games.items():
+		recorded_turns = sum(1 for event_type, _ in read_events(game.events) if event_type == EVENT_INVESTIGATE)
+		#one reaction for the game starting, one for every turn, and replaying the moves has to end up the same way
+		if channel.reactions - 1 != recorded_turns or not await replay_log(games_by_command, bytes(game.events)):
+			mismatched_channels += 1
+		turns += recorded_turns
+	print(f"{channel_count} channels x {bursts} bursts of {PLAYERS_PER_GAME * 2} moves at once")
+	print(f"    games started: {sum(client.metrics.games_started.values())} for {channel_count} channels," +
+		f" turns taken: {turns}")
+	print(f"    channels with lost, duplicated or inconsistent turns: {mismatched_channels}," +
+		f" dropped commands: {client.actors.dropped}")
+
+#usage: gamebot_loadtest.py [channel count] [games per channel] [API latency in ms]
+#	or: gamebot_loadtest.py burst [channel count] [bursts] [API latency in ms]
+if __name__ == "__main__":
+	if sys.argv[1:2] == ["burst"]:
+		asyncio.run(run_burst_test(
+			int(sys.argv[2]) if len(sys.argv) >= 3 else 100,
+			int(sys.argv[3]) if len(sys.argv) >= 4 else 10,
+			float(sys.argv[4]) / 1000 if len(sys.argv) >= 5 else 1))
+	else:
+		asyncio.run(run_load_test(
+			int(sys.argv[1]) if len(sys.argv) >= 2 else 1000,
+			int(sys.argv[2]) if len(sys.argv) >= 3 else 3,
+			float(sys.argv[3]) / 1000 if len(sys.argv) >= 4 else 0))
@@ -0,0 +1,96 @@
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+LOG_QUEUE_SIZE = 10000
+LOG_BATCH_SIZE = 500
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUPS = 5
+
+#writes log records as JSON lines from a background thread, so that a slow disk or pipe never holds up the event
+#	loop; records are batched into one write, files are rotated by size, and when the queue is full new records are
+#	dropped and counted rather than waited on
+class LogWriter:
+	def __init__(self, path, max_bytes = LOG_MAX_BYTES, backups = LOG_BACKUPS, queue_size = LOG_QUEUE_SIZE):
+		#None writes to stdout, without rotation
+		self.path = path
+		self.max_bytes = max_bytes
+		self.backups = backups
+		self.records = queue.Queue(queue_size)
+		self.file = None
+		self.thread = None
+		self.written = 0
+		self.dropped = 0
+		self.failed = 0
+
+	def start(self):
+		self.thread = threading.Thread(target=self.run, name="log writer", daemon=True)
+		self.thread.start()
+
+	#write the remaining records and wait for the thread to finish
+	def stop(self):
+		if not self.thread:
+			return
+		self.records.put(None)
+		self.thread.join()
+		self.thread = None
+
+	def log(self, event, **fields):
+		try:
+			self.records.put_nowait({"time": round(time.time(), 3), "event": event, **fields})
+		except queue.Full:
+			self.dropped += 1
+
+	def run(self):
+		while True:
+			records = [self.records.get()]
+			while len(records) < LOG_BATCH_SIZE and records[-1] is not None:
+				try:
+					records.append(self.records.get_nowait())
+				except queue.Empty:
+					break
+			stopping = records[-1] is None
+			if stopping:
+				records.pop()
+			if records:
+				lines = "".join(json.dumps(record, ensure_ascii=False, default=str) + "\n" for record in records)
+				try:
+					self.write_lines(lines)
+					self.written += len(records)
+				except OSError:
+					self.failed += len(records)
+			if stopping:
+				if self.file:
+					self.file.close()
+					self.file = None
+				return
+
+	def write_lines(self, lines):
+		if self.path is None:
+			sys.stdout.write(lines)
+			sys.stdout.flush()
+			return
+		if not self.file:
+			directory = os.path.dirname(self.path)
+			if directory:
+				os.makedirs(directory, exist_ok=True)
+			self.file = open(self.path, "a", encoding="utf-8")
+		if self.file.tell() and self.file.tell() + len(lines) > self.max_bytes:
+			self.rotate()
+		self.file.write(lines)
+		self.file.flush()
+
+	#gamebot.jsonl -> gamebot.jsonl.1 -> gamebot.jsonl.2 and so on, dropping the oldest
+	def rotate(self):
+		self.file.close()
+		for number in range(self.backups - 1, 0, -1):
+			if os.path.exists(f"{self.path}.{number}"):
+				os.replace(f"{self.path}.{number}", f"{self.path}.{number + 1}")
+		if self.backups:
+			os.replace(self.path, self.path + ".1")
+		else:
+			os.remove(self.path)
+		self.file = open(self.path, "a", encoding="utf-8")
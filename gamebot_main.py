@@ -1,107 +1,435 @@
+import asyncio
 import discord
+from discord import app_commands
+import os
+import signal
+import sys
 import time
-import re
+import traceback
 
+import secrets
 from secrets import DISCORD_TOKEN, GUILD_WHITELISTS
 from game_common import ActiveGame, BotUser, COMMAND_PREFIX
-from game_coin import GameCoin
-from game_cthulhu import GameCthulhu
+from gamebot_actors import ChannelActors
+from gamebot_events import EventStore
+from gamebot_log import LogWriter
+from gamebot_metrics import Metrics
+from gamebot_plugins import find_game_manifests, lazy_games
+from gamebot_profiler import PROFILE_MAX_WINDOW, PROFILE_WINDOW, SamplingProfiler
+from gamebot_router import CommandRouter
+from gamebot_slash import build_slash_commands
+from gamebot_snapshot import SnapshotStore
+from gamebot_timers import TimerWheel
 
 HELP_COMMAND = COMMAND_PREFIX + "help"
 ENDGAME_COMMAND = COMMAND_PREFIX + "endgame"
 BOTTEST_COMMAND = COMMAND_PREFIX + "bottest"
 BOTSAY_COMMAND = COMMAND_PREFIX + "botsay"
+BOTSTATS_COMMAND = COMMAND_PREFIX + "botstats"
+BOTPROFILE_COMMAND = COMMAND_PREFIX + "botprofile"
+SNAPSHOT_DIRECTORY = "snapshots"
+EVENT_DIRECTORY = "events"
+PROFILE_DIRECTORY = "profiles"
+#local port for Prometheus-style metrics, or None to not serve them
+METRICS_PORT = 9464
+#how often idle games are checked for, in seconds, and how many slots the idle timer wheel has
+IDLE_CHECK_INTERVAL = 10
+IDLE_WHEEL_SLOTS = 512
+#whether to register the slash commands with Discord on startup; only the process running shard 0 does it
+SYNC_SLASH_COMMANDS = True
+#how many games a user can be playing at once across every channel, or None for no limit
+MAX_GAMES_PER_USER = None
+#where JSON lines logs are written, or None to write them to stdout; sharded processes add their first shard id
+LOG_PATH = os.path.join("logs", "gamebot.jsonl")
+#users who can run the admin commands; secrets.py files from before there were any don't list them
+ADMIN_USER_IDS = getattr(secrets, "ADMIN_USER_IDS", set())
+#whether to connect with only the intents and caches the bot needs, instead of discord.py's defaults
+LEAN_GATEWAY = True
 
-def timestamp():
-	return time.strftime("%Y-%m-%d %H:%M:%S")
+#what the bot needs from the gateway: guilds and their channels, and messages in them and in DMs; message content is a
+#	privileged intent, which has to be enabled for the bot in the developer portal for text commands to work
+def lean_gateway_options():
+	return {
+		"intents": discord.Intents(guilds=True, guild_messages=True, dm_messages=True, message_content=True),
+		#players come from mentions and slash command options, and are fetched when games are restored, so nothing
+		#	needs the member lists
+		"member_cache_flags": discord.MemberCacheFlags.none(),
+		"chunk_guilds_at_startup": False,
+		#boards are edited through partial messages, so messages don't need to be kept after they're handled
+		"max_messages": None,
+	}
 
-class GameClient(discord.Client):
-	def __init__(self, games):
-		super().__init__(intents=discord.Intents.default())
+#runs every shard it's given in one process; with no shard options discord.py picks the shard count and this process
+#	runs all of them, otherwise gamebot_supervisor.py starts one process per group of shards
+class GameClient(discord.AutoShardedClient):
+	def __init__(self, games, lean_gateway = LEAN_GATEWAY, **options):
+		gateway_options = lean_gateway_options() if lean_gateway else {"intents": discord.Intents.default()}
+		super().__init__(**gateway_options, **options)
+		shard_ids = options.get("shard_ids")
+		#added to the names of the files this process appends to, so that sharded processes don't share them
+		file_suffix = f"-{shard_ids[0]}" if shard_ids else ""
+		self.log = LogWriter(None if LOG_PATH is None else file_suffix.join(os.path.splitext(LOG_PATH)))
 		self.available_games = games
 		self.channel_available_games = {}
+		self.router = CommandRouter(games)
+		self.channel_routers = {}
+		#channel ids are unique across guilds, and a process only ever sees channels in the guilds of its own shards
 		self.active_games = {}
-		self.bot_user_map = {}
+		#user id -> ids of the channels with a game they're playing
+		self.user_games = {}
+		#guild id -> bot name -> bot user
+		self.bot_user_maps = {}
+		#guild id -> ids of its text channels
 		self.last_known_channels = {}
+		self.snapshots = SnapshotStore(SNAPSHOT_DIRECTORY, self.log)
+		#channels with a saved game that hasn't been restored yet, loaded on the first on_ready
+		self.snapshot_channel_ids = None
+		self.snapshot_task = None
+		#channel id -> timer that concludes the channel's game once nobody has made a move for a while
+		self.idle_games = TimerWheel(IDLE_CHECK_INTERVAL, IDLE_WHEEL_SLOTS)
+		self.idle_task = None
+		#every command and change to a channel's game runs in the channel's actor, so they never interleave
+		self.actors = ChannelActors(self.log_actor_error)
+		self.tree = app_commands.CommandTree(self)
+		self.sync_slash_commands = SYNC_SLASH_COMMANDS and (not options.get("shard_ids") or 0 in options["shard_ids"])
+		self.metrics = Metrics()
+		self.metrics.watch_log(self.log)
+		self.events = EventStore(EVENT_DIRECTORY, self.log, file_suffix)
+		self.events_task = None
+		self.profiler = SamplingProfiler(PROFILE_DIRECTORY, self.log, file_suffix)
+		self.loop_lag_task = None
+		self.metrics_server = None
 
+	async def setup_hook(self):
+		self.log.start()
+		client_commands = [
+			(HELP_COMMAND, "List the available games, or show the rules of one", "The game to show the rules of"),
+			(ENDGAME_COMMAND, "End the game in this channel", None),
+		]
+		for command in build_slash_commands(self, client_commands):
+			self.tree.add_command(command)
+		if self.sync_slash_commands:
+			try:
+				await self.tree.sync()
+			except discord.HTTPException as exception:
+				self.log.log("slash_sync_failed", error=str(exception))
+		self.snapshot_task = asyncio.create_task(self.snapshots.run())
+		self.idle_task = asyncio.create_task(self.idle_games.run(self.expire_idle_game))
+		self.events_task = asyncio.create_task(self.events.run())
+		self.metrics.count_api_calls(self.http)
+		self.loop_lag_task = asyncio.create_task(self.metrics.measure_loop_lag())
+		#kill -USR1 starts a profile of the event loop, or stops the one that's running
+		if hasattr(signal, "SIGUSR1"):
+			asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, self.toggle_profile)
+		if METRICS_PORT is not None:
+			#each process of a sharded bot serves its own metrics, offset by its first shard id
+			port = METRICS_PORT + (self.shard_ids[0] if self.shard_ids else 0)
+			try:
+				self.metrics_server = await self.metrics.serve(port, lambda: len(self.active_games))
+			except OSError as exception:
+				self.log.log("metrics_unavailable", port=port, error=str(exception))
+
+	async def close(self):
+		if self.metrics_server:
+			self.metrics_server.close()
+		await self.snapshots.flush()
+		await self.events.flush()
+		if self.profiler.stop():
+			await asyncio.get_running_loop().run_in_executor(None, self.profiler.join)
+		await super().close()
+		await asyncio.get_running_loop().run_in_executor(None, self.log.stop)
+
+	#channels are tracked as guilds and channels come and go, so reconnecting only has to look for guilds that were
+	#	joined or left while the bot was offline
 	async def on_ready(self):
-		connected_channels = {}
-		disconnected_channels = {}
-		for guild in self.guilds:
-			old_channels = self.last_known_channels.get(guild, None)
-			new_channels = {channel for channel in guild.channels if isinstance(channel, discord.TextChannel)}
-			self.last_known_channels[guild] = new_channels
-			if not old_channels:
-				connected_channels[guild] = new_channels
+		saved_channels = None
+		if self.snapshot_channel_ids is None:
+			saved_channels = await self.snapshots.list_channels()
+			self.snapshot_channel_ids = set(saved_channels)
+		guilds = self.guilds
+		guild_ids = {guild.id for guild in guilds}
+		left_guild_ids = [guild_id for guild_id in self.last_known_channels if guild_id not in guild_ids]
+		for guild_id in left_guild_ids:
+			self.remove_guild(guild_id)
+			self.log.log("disconnected", guild=guild_id)
+		joined_guilds = [guild for guild in guilds if guild.id not in self.last_known_channels]
+		for guild in joined_guilds:
+			await self.on_guild_join(guild)
+		if not left_guild_ids and not joined_guilds:
+			self.log.log("back_online")
+		if saved_channels:
+			self.schedule_saved_games(saved_channels)
+
+	#saved games keep the idle deadline they had when they were saved: those that ran out while the bot was offline are
+	#	discarded, and the rest are concluded when it runs out, even if nobody in their channel speaks again; other
+	#	shards' channels aren't found, and are left to their own processes
+	def schedule_saved_games(self, saved_channels):
+		now = time.time()
+		for channel_id, (saved_time, base_command) in saved_channels.items():
+			channel = self.get_channel(channel_id)
+			if channel is None or channel_id not in self.snapshot_channel_ids:
+				continue
+			available_game = base_command and self.channel_routers.get(channel_id, self.router).find_game(base_command)
+			idle_delay = available_game and saved_time + available_game.idle_timeout() - now
+			if not available_game or idle_delay <= 0:
+				self.discard_channel_game(channel_id)
+				self.log.log("saved_game_expired", guild=channel.guild.id, channel=channel_id)
+			else:
+				self.idle_games.schedule(channel_id, channel, idle_delay)
+
+	async def on_guild_join(self, guild):
+		self.track_guild_channels(guild)
+		self.log.log(
+			"connected", guild=guild.id, guild_name=guild.name, channels=len(self.last_known_channels[guild.id]))
+
+	#a guild coming back after a reconnect or an outage, whose channels may have changed while the bot couldn't see them
+	async def on_guild_available(self, guild):
+		if guild.id not in self.last_known_channels:
+			await self.on_guild_join(guild)
+			return
+		created_channel_ids, deleted_channel_ids = self.track_guild_channels(guild)
+		if created_channel_ids or deleted_channel_ids:
+			self.log.log(
+				"channels_reconciled",
+				guild=guild.id,
+				created=len(created_channel_ids),
+				deleted=len(deleted_channel_ids))
+
+	#start tracking the guild's current text channels, discarding the games of those that are gone; returns the ids of
+	#	the channels created and deleted since it was last tracked
+	def track_guild_channels(self, guild):
+		channel_ids = {channel.id for channel in guild.channels if isinstance(channel, discord.TextChannel)}
+		old_channel_ids = self.last_known_channels.get(guild.id, set())
+		self.last_known_channels[guild.id] = channel_ids
+		deleted_channel_ids = old_channel_ids - channel_ids
+		for channel_id in deleted_channel_ids:
+			self.discard_channel_game(channel_id)
+		return channel_ids - old_channel_ids, deleted_channel_ids
+
+	async def on_guild_remove(self, guild):
+		self.remove_guild(guild.id)
+		self.log.log("disconnected", guild=guild.id, guild_name=guild.name)
+
+	#a guild that's gone by the time on_ready runs is only known by its id
+	def remove_guild(self, guild_id):
+		self.bot_user_maps.pop(guild_id, None)
+		for channel_id in self.last_known_channels.pop(guild_id, ()):
+			self.discard_channel_game(channel_id)
+
+	async def on_guild_channel_create(self, channel):
+		if not isinstance(channel, discord.TextChannel) or channel.guild.id not in self.last_known_channels:
+			return
+		self.last_known_channels[channel.guild.id].add(channel.id)
+		self.log.log("channel_connected", guild=channel.guild.id, channel=channel.id, channel_name=channel.name)
+
+	#only a change between text and other channel types matters, for anything else the tracked ids stay the same
+	async def on_guild_channel_update(self, before, after):
+		if isinstance(after, discord.TextChannel) and not isinstance(before, discord.TextChannel):
+			await self.on_guild_channel_create(after)
+		elif isinstance(before, discord.TextChannel) and not isinstance(after, discord.TextChannel):
+			await self.on_guild_channel_delete(before)
+
+	async def on_guild_channel_delete(self, channel):
+		#a channel created while the bot was offline isn't tracked, but it can still have a game
+		self.discard_channel_game(channel.id)
+		guild_channel_ids = self.last_known_channels.get(channel.guild.id)
+		if not guild_channel_ids or channel.id not in guild_channel_ids:
+			return
+		guild_channel_ids.discard(channel.id)
+		self.log.log("channel_disconnected", guild=channel.guild.id, channel=channel.id, channel_name=channel.name)
+
+	#end the channel's game, restored or still saved, without a word, for channels the bot can't see anymore
+	def discard_channel_game(self, channel_id):
+		if channel_id in self.active_games or (self.snapshot_channel_ids and channel_id in self.snapshot_channel_ids):
+			self.actors.submit(channel_id, lambda: self.discard_active_game(channel_id), False)
+
+	def set_channel_games(self, channel_id, games):
+		self.channel_available_games[channel_id] = games
+		self.channel_routers[channel_id] = CommandRouter(games)
+
+	#the game is saved and its idle timer starts over, unless idle_delay says how long a restored game has left; it's
+	#	already saved as it is, and saving it again would move its idle deadline on the next restart
+	def add_active_game(self, channel, game_instance, available_game, router, idle_delay = None):
+		game_instance.available_game = available_game
+		game_instance.commands = router.game_commands(available_game)
+		self.active_games[channel.id] = game_instance
+		for player in game_instance.players():
+			self.user_games.setdefault(player.id, set()).add(channel.id)
+		if idle_delay is None:
+			self.snapshots.mark_dirty(channel.id, game_instance)
+			idle_delay = available_game.idle_timeout()
+		self.idle_games.schedule(channel.id, channel, idle_delay)
+
+	def remove_active_game(self, channel_id):
+		game_instance = self.active_games.pop(channel_id)
+		self.snapshots.mark_removed(channel_id)
+		self.idle_games.cancel(channel_id)
+		self.events.append(game_instance.events)
+		for player_id in {player.id for player in game_instance.players()}:
+			player_games = self.user_games.get(player_id)
+			if player_games is None:
 				continue
-			guild_connected_channels = new_channels - old_channels
-			if guild_connected_channels:
-				connected_channels[guild] = guild_connected_channels
-			guild_disconnected_channels = old_channels - new_channels
-			if guild_disconnected_channels:
-				disconnected_channels[guild] = guild_disconnected_channels
-		if connected_channels or disconnected_channels:
-			print("\n================================")
-			print(timestamp())
-			channels_with_actions = \
-				[("connected to", connected_channels), ("disconnected from", disconnected_channels)]
-			for action, channels in channels_with_actions:
-				if not channels:
-					continue
-				print(f"{self.user} {action} servers:")
-				for guild, guild_channels in channels.items():
-					print(f"    - {guild.name} {guild.id}")
-					for channel in guild_channels:
-						print(f"        #{channel.name} {channel.id}")
-			print("----------------")
+			player_games.discard(channel_id)
+			if not player_games:
+				del self.user_games[player_id]
+
+	async def discard_active_game(self, channel_id):
+		if channel_id in self.active_games:
+			self.remove_active_game(channel_id)
+		elif self.snapshot_channel_ids and channel_id in self.snapshot_channel_ids:
+			self.snapshot_channel_ids.discard(channel_id)
+			self.snapshots.mark_removed(channel_id)
+			self.idle_games.cancel(channel_id)
+
+	async def expire_idle_game(self, channel):
+		game_instance = self.active_games.get(channel.id)
+		self.actors.submit(channel.id, lambda: self.conclude_idle_game(channel, game_instance), False)
+
+	async def conclude_idle_game(self, channel, game_instance):
+		#a command that was already queued when the timer expired made a move, or ended the game and maybe started
+		#	another one
+		if channel.id in self.idle_games.timer_slots:
+			return
+		#a saved game that nobody came back to is restored, to be concluded like any other
+		if game_instance is None and self.snapshot_channel_ids and channel.id in self.snapshot_channel_ids:
+			await self.restore_game(channel, self.channel_routers.get(channel.id, self.router))
+			game_instance = self.active_games.get(channel.id)
+		if game_instance is None or self.active_games.get(channel.id) is not game_instance:
+			return
+		idle_minutes = game_instance.available_game.idle_timeout() // 60
+		self.remove_active_game(channel.id)
+		try:
+			await channel.send(f"🎲 Game concluded after {idle_minutes} minutes without a move.")
+		except discord.HTTPException as exception:
+			self.log.log("idle_notice_failed", guild=channel.guild.id, channel=channel.id, error=str(exception))
+
+	#the first of these users who is already in as many games as they're allowed to be, if any
+	def find_busy_player(self, users):
+		if MAX_GAMES_PER_USER is None:
+			return None
+		return next((user for user in users if len(self.user_games.get(user.id, ())) >= MAX_GAMES_PER_USER), None)
+
+	async def fetch_player(self, user_id):
+		return self.get_user(user_id) or await self.fetch_user(user_id)
+
+	async def restore_game(self, channel, router):
+		self.snapshot_channel_ids.discard(channel.id)
+		snapshot = await self.snapshots.load(channel.id)
+		available_game = snapshot and router.find_game(snapshot["game"])
+		game_instance = None
+		if available_game:
+			try:
+				game_instance = await available_game.restore_game(snapshot["state"], channel, self.fetch_player)
+			except discord.HTTPException as exception:
+				self.log.log("restore_failed", guild=channel.guild.id, channel=channel.id, error=str(exception))
+		if game_instance:
+			self.add_active_game(
+				channel, game_instance, available_game, router, self.idle_games.remaining(channel.id))
 		else:
-			print(timestamp() + ": Back online")
+			self.snapshots.mark_removed(channel.id)
+			self.idle_games.cancel(channel.id)
 
 	async def on_message(self, message):
+		game = self.active_games.get(message.channel.id)
+		if game:
+			game.notice_message(message)
 		if message.author.id == self.user.id:
 			return
 		if isinstance(message.channel, discord.DMChannel):
 			await self.handle_private_message(message)
-		else:
-			await self.handle_public_message(message)
+			return
+		if not self.is_command(message):
+			return
+		handled = self.actors.submit(message.channel.id, lambda: self.handle_command(message))
+		if not handled:
+			self.log.log("mailbox_full", guild=message.channel.guild.id, channel=message.channel.id)
+			return
+		await handled
 
-	async def handle_public_message(self, message):
+	async def handle_command(self, message):
+		start = time.perf_counter()
+		await self.handle_public_message(message)
+		latency = time.perf_counter() - start
+		self.metrics.observe("on_message", latency)
+		active_game = self.active_games.get(message.channel.id)
+		self.log.log(
+			"command",
+			guild=message.channel.guild.id,
+			channel=message.channel.id,
+			user=message.author.id,
+			command=message.content.split(" ", 1)[0],
+			game=active_game.available_game.base_command() if active_game else None,
+			latency_ms=round(latency * 1000, 3))
+
+	def log_actor_error(self, channel_id, exception):
+		self.log.log(
+			"handler_error",
+			channel=channel_id,
+			error="".join(traceback.format_exception(exception)))
+
+	#whether this is a command in a channel the bot plays in
+	@staticmethod
+	def is_command(message):
 		if not message.content.startswith(COMMAND_PREFIX):
-			return
+			return False
 		guild_whitelist = GUILD_WHITELISTS.get(message.channel.guild.id, None)
-		if guild_whitelist and message.channel.id not in guild_whitelist:
+		return not guild_whitelist or message.channel.id in guild_whitelist
+
+	async def handle_public_message(self, message):
+		if not self.is_command(message):
 			return
 
-		message.content = re.sub(r"\s+", " ", message.content)
+		message.content = " ".join(message.content.split())
 		space_i = message.content.find(" ")
 		base_command = message.content if space_i == -1 else message.content[:space_i]
 
-		available_games = self.channel_available_games.get(message.channel.id, self.available_games)
+		router = self.channel_routers.get(message.channel.id, self.router)
+		if self.snapshot_channel_ids and message.channel.id in self.snapshot_channel_ids:
+			await self.restore_game(message.channel, router)
+
+		if base_command == BOTSTATS_COMMAND and message.author.id in ADMIN_USER_IDS:
+			await message.channel.send(self.metrics.summary(len(self.active_games)))
+			return
+
+		if base_command == BOTPROFILE_COMMAND and message.author.id in ADMIN_USER_IDS:
+			await message.channel.send(self.profile_command(message.content.split(" ")[1:]))
+			return
+
 		if base_command == HELP_COMMAND:
 			help_contents = message.content.split(" ")
 			if len(help_contents) >= 2:
 				help_command = COMMAND_PREFIX + help_contents[1]
-				for game in available_games:
-					if game.base_command() == help_command:
-						await game.share_rules(message.channel)
-						return
+				game = router.find_game(help_command)
+				if game:
+					await game.share_rules(message.channel)
+					return
 				await message.channel.send(
 					"Unknown command `" + help_command + "`; use `!help` to list all available games")
 			else:
-				help_message = ["Available games:"]
-				for game in available_games:
-					help_message.append("    `" + game.base_command()[1:] + "`")
-				help_message.append("For rules about a particular game, use `" + HELP_COMMAND + " command`")
-				help_message.append("You can end any game with `" + ENDGAME_COMMAND + "`")
-				await message.channel.send("\n".join(help_message))
+				if not router.help_message:
+					help_message = ["Available games:"]
+					for game in router.games:
+						help_message.append("    `" + game.base_command()[1:] + "`")
+					help_message.append("For rules about a particular game, use `" + HELP_COMMAND + " command`")
+					help_message.append("You can end any game with `" + ENDGAME_COMMAND + "`")
+					router.help_message = "\n".join(help_message)
+				await message.channel.send(router.help_message)
 			return
 
 		active_game = self.active_games.get(message.channel.id)
 		if active_game:
+			game_name = active_game.available_game.base_command()
 			if (message.content == ENDGAME_COMMAND
-					or not await active_game.handle_public_message(base_command, message)):
+					or (base_command in active_game.commands
+						and not await self.metrics.time_call(
+							game_name + " " + base_command,
+							game_name,
+							active_game.handle_public_message(base_command, message)))):
 				await message.channel.send("🎲 Game concluded.")
-				del self.active_games[message.channel.id]
+				self.remove_active_game(message.channel.id)
+			elif base_command in active_game.commands:
+				self.snapshots.mark_dirty(message.channel.id, active_game)
+				self.idle_games.schedule(message.channel.id, message.channel, active_game.available_game.idle_timeout())
 			#speak the message as a bot user
 			elif base_command == BOTSAY_COMMAND:
 				contents = message.content.split(" ")
@@ -109,7 +437,8 @@ class GameClient(discord.Client):
 					await message.channel.send("Please specify a bot name followed by a command")
 					return
 				bot_name = contents[1]
-				bot_user = self.bot_user_map.get(bot_name)
+				bot_user_map = self.bot_user_maps.get(message.channel.guild.id, {})
+				bot_user = bot_user_map.get(bot_name)
 				if not bot_user:
 					await message.channel.send("\"" + bot_name + "\" is not a bot player")
 					return
@@ -119,18 +448,25 @@ class GameClient(discord.Client):
 				for word in new_contents:
 					if not word.startswith("@"):
 						continue
-					bot_user = self.bot_user_map.get(word[1:])
+					bot_user = bot_user_map.get(word[1:])
 					if bot_user:
 						message.mentions.append(bot_user)
 				message.content = " ".join(new_contents)
 				await self.handle_public_message(message)
 			return
 
-		for available_game in available_games:
-			game_instance = await available_game.start_new_game(base_command, message)
+		available_game = router.find_game(base_command)
+		if available_game:
+			busy_player = self.find_busy_player(message.mentions)
+			if busy_player:
+				await message.channel.send(busy_player.mention + " is already playing a game")
+				return
+			game_instance = await self.metrics.time_call(
+				base_command, base_command, available_game.start_new_game(base_command, message))
 			if game_instance:
 				if isinstance(game_instance, ActiveGame):
-					self.active_games[message.channel.id] = game_instance
+					self.metrics.record_game_started(base_command)
+					self.add_active_game(message.channel, game_instance, available_game, router)
 					await message.add_reaction("🎲")
 				return
 
@@ -140,18 +476,46 @@ class GameClient(discord.Client):
 			if len(contents) < 3 or not contents[1].isdigit():
 				await message.channel.send("Please specify a bot count followed by a command")
 				return
-			bot_users = [BotUser(chr(ord("A") + bot_num)) for bot_num in range(0, int(contents[1]))]
-			self.bot_user_map = {bot_user.name: bot_user for bot_user in bot_users}
+			bot_users = [BotUser(chr(ord("A") + bot_num), self.log) for bot_num in range(0, int(contents[1]))]
+			self.bot_user_maps[message.channel.guild.id] = {bot_user.name: bot_user for bot_user in bot_users}
 			message.mentions = bot_users
 			message.content = " ".join(contents[2:])
 			await self.handle_public_message(message)
 
+	#arguments are start, optionally followed by how many seconds to profile for, or stop
+	def profile_command(self, arguments):
+		if not SamplingProfiler.supported():
+			return "Profiling isn't supported on this platform"
+		if arguments[:1] == ["start"]:
+			window = PROFILE_WINDOW
+			if len(arguments) >= 2 and arguments[1].isdigit():
+				window = min(max(int(arguments[1]), 1), PROFILE_MAX_WINDOW)
+			path = self.profiler.start(window)
+			return f"Profiling for {window}s, writing to `{path}`" if path else "A profile is already running"
+		if arguments[:1] == ["stop"]:
+			path = self.profiler.stop()
+			return f"Stopped profiling, writing to `{path}`" if path else "No profile is running"
+		return f"Please specify `{BOTPROFILE_COMMAND} start [seconds]` or `{BOTPROFILE_COMMAND} stop`"
+
+	def toggle_profile(self):
+		if not self.profiler.stop():
+			self.profiler.start()
+
 	async def handle_private_message(self, message):
-		print(f"{timestamp()}: Private message from {message.author.mention} {message.author}: {message.content}")
-
-client = GameClient(games = [
-	GameCthulhu(),
-	GameCthulhu().kitten_reskin(),
-	GameCoin()
-])
-client.run(DISCORD_TOKEN, log_handler=None)
+		self.log.log("private_message", user=message.author.id, user_name=str(message.author), content=message.content)
+
+#games are only imported and built once one of their commands is used
+def default_games():
+	return lazy_games(find_game_manifests())
+
+#usage: gamebot_main.py [shard count] [shard id ...]
+def main(argv):
+	shard_options = {}
+	if len(argv) >= 2:
+		shard_options["shard_count"] = int(argv[1])
+		shard_options["shard_ids"] = [int(shard_id) for shard_id in argv[2:]] or None
+	client = GameClient(games=default_games(), **shard_options)
+	client.run(DISCORD_TOKEN, log_handler=None)
+
+if __name__ == "__main__":
+	main(sys.argv)
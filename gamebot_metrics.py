@@ -0,0 +1,167 @@
+import asyncio
+import bisect
+import contextvars
+import time
+
+#upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+LOOP_LAG_INTERVAL = 1
+NO_GAME = "none"
+
+#the game whose handler is running, so that API calls can be attributed to it
+current_game = contextvars.ContextVar("current_game", default=NO_GAME)
+
+class Histogram:
+	__slots__ = ("bucket_counts", "total", "count")
+
+	def __init__(self):
+		#the last bucket counts everything above the largest bound
+		self.bucket_counts = [0] * (len(LATENCY_BUCKETS) + 1)
+		self.total = 0
+		self.count = 0
+
+	def observe(self, seconds):
+		self.bucket_counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+		self.total += seconds
+		self.count += 1
+
+	#the upper bound of the bucket that holds this quantile
+	def quantile(self, fraction):
+		target = fraction * self.count
+		seen = 0
+		for bound, bucket_count in zip(LATENCY_BUCKETS, self.bucket_counts):
+			seen += bucket_count
+			if seen >= target:
+				return bound
+		return float("inf")
+
+class Metrics:
+	def __init__(self):
+		#handler name -> Histogram
+		self.latencies = {}
+		#(game, route) -> count
+		self.api_calls = {}
+		#game -> count
+		self.games_started = {}
+		self.loop_lag = Histogram()
+		#the LogWriter whose written, dropped and failed records are reported, if any
+		self.log = None
+
+	def observe(self, name, seconds):
+		histogram = self.latencies.get(name)
+		if not histogram:
+			histogram = self.latencies[name] = Histogram()
+		histogram.observe(seconds)
+
+	async def time_call(self, name, game, coroutine):
+		token = current_game.set(game)
+		start = time.perf_counter()
+		try:
+			return await coroutine
+		finally:
+			self.observe(name, time.perf_counter() - start)
+			current_game.reset(token)
+
+	def record_game_started(self, game):
+		self.games_started[game] = self.games_started.get(game, 0) + 1
+
+	def record_api_call(self, route):
+		key = (current_game.get(), route)
+		self.api_calls[key] = self.api_calls.get(key, 0) + 1
+
+	#every REST call discord.py makes goes through HTTPClient.request, so counting there catches sends, edits,
+	#	deletes and reactions alike
+	def count_api_calls(self, http):
+		request = http.request
+
+		async def counted_request(route, *args, **kwargs):
+			self.record_api_call(route.method + " " + route.path)
+			return await request(route, *args, **kwargs)
+
+		http.request = counted_request
+
+	def watch_log(self, log):
+		self.log = log
+
+	#outcome -> how many log records had it
+	def log_records(self):
+		if not self.log:
+			return {}
+		return {"written": self.log.written, "dropped": self.log.dropped, "failed": self.log.failed}
+
+	async def measure_loop_lag(self):
+		while True:
+			start = time.perf_counter()
+			await asyncio.sleep(LOOP_LAG_INTERVAL)
+			self.loop_lag.observe(max(time.perf_counter() - start - LOOP_LAG_INTERVAL, 0))
+
+	def game_api_calls(self):
+		game_api_calls = {}
+		for (game, _), count in self.api_calls.items():
+			game_api_calls[game] = game_api_calls.get(game, 0) + count
+		return game_api_calls
+
+	def summary(self, active_games):
+		lines = [f"Active games: {active_games}"]
+		lines.append(
+			f"Event loop lag: p50 <{self.loop_lag.quantile(0.5) * 1000:g}ms," +
+				f" p99 <{self.loop_lag.quantile(0.99) * 1000:g}ms")
+		log_records = self.log_records()
+		if log_records:
+			lines.append("Log records: " + ", ".join(f"{count} {outcome}" for outcome, count in log_records.items()))
+		lines.append("Handler latency:")
+		for name, histogram in sorted(self.latencies.items()):
+			lines.append(
+				f"    `{name}`: {histogram.count} calls, p50 <{histogram.quantile(0.5) * 1000:g}ms," +
+					f" p99 <{histogram.quantile(0.99) * 1000:g}ms")
+		lines.append("API calls per game:")
+		for game, count in sorted(self.game_api_calls().items()):
+			games_started = self.games_started.get(game)
+			lines.append(
+				f"    `{game}`: {count} total" + (f", {count / games_started:.1f} per game" if games_started else ""))
+		return "\n".join(lines)
+
+	#Prometheus text exposition format
+	def render_prometheus(self, active_games):
+		lines = ["# TYPE gamebot_active_games gauge", f"gamebot_active_games {active_games}"]
+		lines.append("# TYPE gamebot_handler_seconds histogram")
+		for name, histogram in sorted(self.latencies.items()):
+			lines += self.render_histogram("gamebot_handler_seconds", f"handler=\"{name}\"", histogram)
+		lines.append("# TYPE gamebot_event_loop_lag_seconds histogram")
+		lines += self.render_histogram("gamebot_event_loop_lag_seconds", "", self.loop_lag)
+		lines.append("# TYPE gamebot_api_calls_total counter")
+		for (game, route), count in sorted(self.api_calls.items()):
+			lines.append(f"gamebot_api_calls_total{{game=\"{game}\",route=\"{route}\"}} {count}")
+		lines.append("# TYPE gamebot_log_records_total counter")
+		for outcome, count in self.log_records().items():
+			lines.append(f"gamebot_log_records_total{{outcome=\"{outcome}\"}} {count}")
+		lines.append("# TYPE gamebot_games_started_total counter")
+		for game, count in sorted(self.games_started.items()):
+			lines.append(f"gamebot_games_started_total{{game=\"{game}\"}} {count}")
+		return "\n".join(lines) + "\n"
+
+	@staticmethod
+	def render_histogram(metric, labels, histogram):
+		separator = "," if labels else ""
+		lines = []
+		cumulative_count = 0
+		for bound, bucket_count in zip(LATENCY_BUCKETS + ["+Inf"], histogram.bucket_counts):
+			cumulative_count += bucket_count
+			lines.append(f"{metric}_bucket{{{labels}{separator}le=\"{bound}\"}} {cumulative_count}")
+		lines.append(f"{metric}_sum{{{labels}}} {histogram.total}")
+		lines.append(f"{metric}_count{{{labels}}} {histogram.count}")
+		return lines
+
+	#serve render_prometheus() over plain HTTP on the local machine
+	async def serve(self, port, active_games):
+		async def handle_request(reader, writer):
+			await reader.readline()
+			body = self.render_prometheus(active_games()).encode()
+			writer.write(
+				b"HTTP/1.0 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n" +
+					f"Content-Length: {len(body)}\r\n\r\n".encode() +
+					body)
+			await writer.drain()
+			writer.close()
+
+		return await asyncio.start_server(handle_request, "127.0.0.1", port)
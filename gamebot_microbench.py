@@ -0,0 +1,209 @@
+import asyncio
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+
+from game_common import ActiveGame
+from game_cthulhu import GameCthulhu, GameCthulhuInstance
+from gamebot_fakes import FakeChannel, FakeGuild, FakeUser
+from gamebot_loadtest import FakeGateway
+from gamebot_main import GameClient, default_games
+
+BASELINE_PATH = "microbench_baseline.json"
+PLAYER_COUNTS = [5, 10, 30, 60]
+REPEATS = 15
+#how much slower than its baseline a path may get before the suite fails, by benchmark name prefix; the paths that
+#	take a few microseconds are noisier, so they get more room
+BUDGETS = {
+	"list_phrase": 1.5,
+	"post_game_state": 1.4,
+	"dispatch": 1.5,
+}
+DEFAULT_BUDGET = 1.3
+#a path whose runs were spread out when the baseline was saved gets this many times its spread as room on top, up to
+#	MAX_NOISE_ROOM, so that a noisy baseline can't hide real regressions
+NOISE_ALLOWANCE = 3
+MAX_NOISE_ROOM = 0.5
+#how many more times a benchmark is run when saving a baseline, or when one of its paths is over budget, keeping each
+#	path's best median, so that a burst of load on the machine neither skews the baseline nor fails the suite
+CONFIRM_RUNS = 2
+
+CALIBRATION_ITERATIONS = 200
+
+#a fixed mix of the interpreter work the benchmarked paths do; paths are compared in units of it, so that the whole
+#	machine being slower or faster than when the baseline was saved doesn't count
+def calibration():
+	items = [f"item {number}" for number in range(0, 50)]
+	index = {}
+	for i, item in enumerate(items):
+		index[item] = i
+	" ".join(item for item in items if index[item] % 3)
+
+def time_calibration():
+	start = time.perf_counter()
+	for _ in range(0, CALIBRATION_ITERATIONS):
+		calibration()
+	return (time.perf_counter() - start) / CALIBRATION_ITERATIONS
+
+#REPEATS runs of iterations calls each, as pairs of the seconds per call and the seconds per calibration call timed
+#	right before the run, so that both see the same load on the machine; garbage collection is off like in timeit, to
+#	keep noise from earlier benchmarks out of the numbers
+async def time_runs(iterations, run):
+	runs = []
+	gc.collect()
+	gc.disable()
+	try:
+		for _ in range(0, REPEATS):
+			calibration_seconds = time_calibration()
+			start = time.perf_counter()
+			for _ in range(0, iterations):
+				await run()
+			runs.append(((time.perf_counter() - start) / iterations, calibration_seconds))
+	finally:
+		gc.enable()
+	return runs
+
+async def started_game(player_count):
+	players = [FakeUser(str(number)) for number in range(0, player_count)]
+	channel = FakeChannel()
+	instance = GameCthulhuInstance(GameCthulhu(), channel, players, *GameCthulhu.role_counts(player_count)[:2])
+	await instance.start_game()
+	return instance
+
+async def bench_list_phrase(results):
+	for item_count in [3, 10, 60]:
+		items = [f"item {number}" for number in range(0, item_count)]
+
+		async def list_phrase():
+			ActiveGame.list_phrase(items)
+
+		results[f"list_phrase, {item_count} items"] = await time_runs(2000, list_phrase)
+
+async def bench_deal_hands(results):
+	for player_count in PLAYER_COUNTS:
+		instance = await started_game(player_count)
+		deck = bytearray(player_count * 5)
+
+		async def deal_hands():
+			instance.deal_hands(5, deck)
+
+		results[f"deal_hands, {player_count} players"] = await time_runs(500, deal_hands)
+
+async def bench_advance_round(results):
+	for player_count in PLAYER_COUNTS:
+		instance = await started_game(player_count)
+
+		async def advance_round():
+			instance.current_round = 0
+			await instance.advance_round()
+
+		results[f"advance_round, {player_count} players"] = await time_runs(200, advance_round)
+
+async def bench_post_game_state(results):
+	for player_count in PLAYER_COUNTS:
+		instance = await started_game(player_count)
+
+		async def post_game_state():
+			await instance.post_game_state(None)
+
+		results[f"post_game_state, {player_count} players"] = await time_runs(500, post_game_state)
+
+async def bench_dispatch(results):
+	client = GameClient(games=default_games())
+	gateway = FakeGateway(client)
+	channel = FakeChannel()
+	channel.guild = FakeGuild("microbench")
+	spectator = FakeUser("spectator")
+	for player_count in PLAYER_COUNTS:
+		players = [FakeUser(str(number)) for number in range(0, player_count)]
+		await gateway.deliver(channel, "!cthulhu " + " ".join(player.mention for player in players), players[0], players)
+
+		#a command that reaches the game but doesn't change it
+		async def dispatch_move():
+			await client.handle_public_message(channel.receive("!to " + players[0].mention, spectator, [players[0]]))
+
+		results[f"dispatch, !to from a spectator, {player_count} players"] = await time_runs(500, dispatch_move)
+		await gateway.deliver(channel, "!endgame", players[0])
+
+	async def dispatch_help():
+		await client.handle_public_message(channel.receive("!help", spectator, []))
+
+	results["dispatch, !help"] = await time_runs(500, dispatch_help)
+
+MICROBENCHMARKS = [bench_list_phrase, bench_deal_hands, bench_advance_round, bench_post_game_state, bench_dispatch]
+
+#the median of a path's runs in seconds, the median of its runs in units of the calibration timed next to each of
+#	them, and how spread out those were, as the interquartile range over the median
+def summarize(runs):
+	quartiles = statistics.quantiles([run_seconds / calibration_seconds for run_seconds, calibration_seconds in runs], n=4)
+	relative = quartiles[1]
+	return {
+		"median": statistics.median(run_seconds for run_seconds, _ in runs),
+		"relative": relative,
+		"spread": (quartiles[2] - quartiles[0]) / relative,
+	}
+
+#how many times its baseline median a path's median may take
+def limit_for(name, baseline_entry):
+	budget = next((budget for prefix, budget in BUDGETS.items() if name.startswith(prefix)), DEFAULT_BUDGET)
+	return budget + min(NOISE_ALLOWANCE * baseline_entry["spread"], MAX_NOISE_ROOM)
+
+def run_benchmark(benchmark):
+	results = {}
+	asyncio.run(benchmark(results))
+	return {name: summarize(runs) for name, runs in results.items()}
+
+def slowdown(name, entry, baseline):
+	return entry["relative"] / baseline[name]["relative"]
+
+def over_limit(name, entry, baseline):
+	return name in baseline and slowdown(name, entry, baseline) > limit_for(name, baseline[name])
+
+#usage: gamebot_microbench.py [--save]
+#runs every microbenchmark and compares the median of each path with the baseline, in calibration units, exiting with
+#	1 if any path went over its limit; --save, or having no baseline yet, records the results as the new baseline
+#	instead
+def main(argv):
+	baseline = None
+	if os.path.exists(BASELINE_PATH) and "--save" not in argv:
+		with open(BASELINE_PATH, encoding="utf-8") as file:
+			baseline = json.load(file)
+		#baselines from before paths were measured in calibration units are replaced
+		if not all(isinstance(entry, dict) for entry in baseline.values()):
+			baseline = None
+	results = {}
+	for benchmark in MICROBENCHMARKS:
+		benchmark_results = run_benchmark(benchmark)
+		for _ in range(0, CONFIRM_RUNS):
+			if baseline and not any(over_limit(name, entry, baseline) for name, entry in benchmark_results.items()):
+				break
+			for name, entry in run_benchmark(benchmark).items():
+				if entry["relative"] < benchmark_results[name]["relative"]:
+					benchmark_results[name] = entry
+		results.update(benchmark_results)
+	regressions = 0
+	for name, entry in results.items():
+		if not baseline or name not in baseline:
+			print(f"{name:<48} {entry['median'] * 1e6:10.2f} us  spread {entry['spread']:5.1%}")
+			continue
+		ratio = slowdown(name, entry, baseline)
+		over_budget = over_limit(name, entry, baseline)
+		regressions += over_budget
+		print(
+			f"{name:<48} {entry['median'] * 1e6:10.2f} us {ratio:6.2f}x baseline," +
+				f" limit {limit_for(name, baseline[name]):4.2f}x" + ("  OVER BUDGET" if over_budget else ""))
+	if baseline is None:
+		with open(BASELINE_PATH, "w", encoding="utf-8") as file:
+			json.dump(results, file, indent="\t")
+		print(f"saved the baseline to {BASELINE_PATH}")
+		return 0
+	if regressions:
+		print(f"{regressions} paths went over their budget")
+		return 1
+	return 0
+
+if __name__ == "__main__":
+	sys.exit(main(sys.argv))
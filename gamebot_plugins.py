@@ -0,0 +1,97 @@
+import importlib
+import importlib.metadata
+
+from game_common import AvailableGame, COMMAND_PREFIX
+
+#installed packages can add games by listing a GameManifest list under this entry point group
+ENTRY_POINT_GROUP = "gamebot.games"
+
+#what the client needs to know about a game before its module is imported: its commands, a "module:callable"
+#	reference to the function that builds the AvailableGame, and how many players its commands name, as in
+#	AvailableGame.start_player_count() and move_player_count()
+class GameManifest:
+	__slots__ = ("base_command", "game_commands", "factory", "start_player_count", "move_player_count")
+
+	def __init__(self, base_command, game_commands, factory, start_player_count = None, move_player_count = 1):
+		self.base_command = base_command
+		self.game_commands = game_commands
+		self.factory = factory
+		self.start_player_count = start_player_count
+		self.move_player_count = move_player_count
+
+GAME_MANIFESTS = [
+	GameManifest(
+		COMMAND_PREFIX + "cthulhu",
+		[COMMAND_PREFIX + "to", COMMAND_PREFIX + "pass", COMMAND_PREFIX + "investigate"],
+		"game_cthulhu:GameCthulhu"),
+	GameManifest(
+		COMMAND_PREFIX + "kitten",
+		[COMMAND_PREFIX + "to", COMMAND_PREFIX + "pet", COMMAND_PREFIX + "poke"],
+		"game_cthulhu:kitten_game"),
+	GameManifest(
+		COMMAND_PREFIX + "coin",
+		[COMMAND_PREFIX + "heads", COMMAND_PREFIX + "tails"],
+		"game_coin:GameCoin",
+		0,
+		0),
+]
+
+#stands in for a game until one of its commands is used, then imports and builds it
+class LazyGame(AvailableGame):
+	def __init__(self, manifest):
+		self.manifest = manifest
+		self.game = None
+
+	#the client routes and builds slash commands by the manifest, so a game that drifted from its manifest would
+	#	silently miss some of its commands; it's refused instead
+	def load(self):
+		if not self.game:
+			module_name, factory_name = self.manifest.factory.split(":")
+			game = getattr(importlib.import_module(module_name), factory_name)()
+			game_description = self.describe(game)
+			manifest_description = self.describe(self)
+			if game_description != manifest_description:
+				raise ValueError(
+					f"{self.manifest.factory} has the commands {game_description}," +
+						f" its manifest lists {manifest_description}")
+			self.game = game
+		return self.game
+
+	#commands, and how many players the start and in-game commands name
+	@staticmethod
+	def describe(game):
+		return (game.base_command(), list(game.game_commands()), game.start_player_count(), game.move_player_count())
+
+	def base_command(self):
+		return self.manifest.base_command
+
+	def game_commands(self):
+		return self.manifest.game_commands
+
+	def start_player_count(self):
+		return self.manifest.start_player_count
+
+	def move_player_count(self):
+		return self.manifest.move_player_count
+
+	def idle_timeout(self):
+		return self.load().idle_timeout()
+
+	async def share_rules(self, channel):
+		await self.load().share_rules(channel)
+
+	async def start_new_game(self, base_command, message):
+		return await self.load().start_new_game(base_command, message)
+
+	async def restore_game(self, snapshot, channel, fetch_player):
+		return await self.load().restore_game(snapshot, channel, fetch_player)
+
+#the built-in manifests followed by those of installed plugins
+def find_game_manifests():
+	manifests = list(GAME_MANIFESTS)
+	for entry_point in importlib.metadata.entry_points(group=ENTRY_POINT_GROUP):
+		manifests += entry_point.load()
+	return manifests
+
+def lazy_games(manifests):
+	return [LazyGame(manifest) for manifest in manifests]
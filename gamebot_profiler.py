@@ -0,0 +1,118 @@
+import asyncio
+import os
+import signal
+import threading
+import time
+
+#how often the event loop is sampled, in seconds
+PROFILE_INTERVAL = 0.005
+#how long a profile runs unless it's stopped early, and the longest one that can be asked for, in seconds
+PROFILE_WINDOW = 60
+PROFILE_MAX_WINDOW = 600
+
+#samples the call stack of the main thread, which runs the event loop, on a wall clock timer for a fixed window, then
+#	writes how many samples saw each stack as a collapsed-stack file that flamegraph.pl, inferno and speedscope read;
+#	frames are named by module and qualified name, so game handlers show up under their game classes
+#sampling from another thread would need the GIL, which the loop hands over whenever it polls for events, so almost
+#	every sample would land in the poll; a timer signal is handled in the main thread at the exact bytecode it
+#	interrupted instead, and the time spent waiting for events shows up as the selector's frames
+class SamplingProfiler:
+	def __init__(self, directory, log, suffix = "", interval = PROFILE_INTERVAL):
+		self.directory = directory
+		self.log = log
+		#added to file names, so that processes of a sharded bot don't write to the same files
+		self.suffix = suffix
+		self.interval = interval
+		#stack, outermost frame first -> sample count, while a profile is running
+		self.stacks = None
+		self.sample_count = 0
+		self.deadline = None
+		#set by the signal handler once the window is over, the loop stops the profile after that
+		self.window_over = False
+		self.loop = None
+		self.path = None
+		self.previous_handler = None
+		self.writer = None
+		#code object -> frame name
+		self.frame_names = {}
+
+	@staticmethod
+	def supported():
+		return hasattr(signal, "setitimer")
+
+	def running(self):
+		return self.stacks is not None
+
+	#start sampling for window seconds, and return the path the profile will be written to, or None if a profile is
+	#	already running; has to be called from the event loop, in the main thread, like everything that installs a
+	#	signal handler
+	def start(self, window = PROFILE_WINDOW):
+		if self.running():
+			return None
+		self.loop = asyncio.get_running_loop()
+		self.stacks = {}
+		self.sample_count = 0
+		self.deadline = time.monotonic() + window
+		self.window_over = False
+		self.path = os.path.join(self.directory, time.strftime("%Y-%m-%d-%H%M%S") + self.suffix + ".folded")
+		self.previous_handler = signal.signal(signal.SIGALRM, self.sample)
+		signal.setitimer(signal.ITIMER_REAL, self.interval, self.interval)
+		self.log.log("profile_started", path=self.path, window=window)
+		return self.path
+
+	#end the window early, the profile is still written; returns its path, or None if no profile is running
+	def stop(self):
+		if not self.running():
+			return None
+		signal.setitimer(signal.ITIMER_REAL, 0)
+		signal.signal(signal.SIGALRM, self.previous_handler)
+		stacks = self.stacks
+		self.stacks = None
+		#don't keep every code object that was ever sampled alive until the next profile
+		self.frame_names = {}
+		#writing thousands of stacks would stall the loop
+		self.writer = threading.Thread(
+			target=self.write_profile, args=(self.path, stacks, self.sample_count), name="profile writer")
+		self.writer.start()
+		return self.path
+
+	#wait for the last profile to be written
+	def join(self):
+		if self.writer:
+			self.writer.join()
+
+	#the signal handler; it can interrupt the main thread anywhere, even while it holds one of threading's locks, so it
+	#	only counts the stack, and leaves stopping the profile and starting the writer thread to the loop
+	def sample(self, signal_number, frame):
+		if self.stacks is None or self.window_over:
+			return
+		names = []
+		while frame is not None:
+			name = self.frame_names.get(frame.f_code)
+			if name is None:
+				name = self.frame_names[frame.f_code] = self.frame_name(frame)
+			names.append(name)
+			frame = frame.f_back
+		names.reverse()
+		stack = tuple(names)
+		self.stacks[stack] = self.stacks.get(stack, 0) + 1
+		self.sample_count += 1
+		if time.monotonic() >= self.deadline:
+			self.window_over = True
+			self.loop.call_soon_threadsafe(self.stop)
+
+	@staticmethod
+	def frame_name(frame):
+		code = frame.f_code
+		return frame.f_globals.get("__name__", "?") + ":" + getattr(code, "co_qualname", code.co_name)
+
+	def write_profile(self, path, stacks, sample_count):
+		try:
+			os.makedirs(self.directory, exist_ok=True)
+			with open(path, "w", encoding="utf-8") as file:
+				for stack, count in sorted(stacks.items(), key=lambda item: -item[1]):
+					file.write(";".join(stack) + f" {count}\n")
+		except OSError as exception:
+			self.log.log("profile_failed", path=path, error=str(exception))
+			return
+		self.log.log("profile_written", path=path, samples=sample_count, stacks=len(stacks))
@@ -0,0 +1,78 @@
+import asyncio
+import sys
+import time
+
+from game_coin import GameCoin, GameCoinInstance, HEADS_COMMAND, TAILS_COMMAND
+from game_common import SEED_BYTES
+from game_cthulhu import GameCthulhu, GameCthulhuInstance
+from game_events import EVENT_GUESS, EVENT_INVESTIGATE, EVENT_START, read_events, read_start, record_start
+from gamebot_events import read_logs
+from gamebot_fakes import FakeChannel, FakeUser
+from gamebot_plugins import find_game_manifests, lazy_games
+
+#reruns recorded games from their seeds and recorded moves against the game classes, with fake players and channels,
+#	and checks that each replayed game records the same event log as the original, down to every dealt card
+
+async def replay_cthulhu(texts, setup, records):
+	seed = int.from_bytes(setup[:SEED_BYTES], "little")
+	players = [FakeUser(str(number)) for number in range(0, len(setup) - SEED_BYTES - 1)]
+	channel = FakeChannel()
+	cultist_count, extra_roles_count, _ = texts.role_counts(len(players))
+	instance = GameCthulhuInstance(texts, channel, players, cultist_count, extra_roles_count, seed)
+	await instance.start_game()
+	base_command = texts.investigate_commands[0]
+	for event_type, payload in records:
+		if event_type != EVENT_INVESTIGATE:
+			continue
+		author = players[payload[0]]
+		target = players[payload[1]]
+		message = channel.receive(base_command + " " + target.mention, author, [target])
+		if not await instance.handle_public_message(base_command, message):
+			break
+	return instance.events
+
+async def replay_coin(game, setup, records):
+	instance = GameCoinInstance(int.from_bytes(setup, "little"))
+	record_start(instance.events, game.base_command(), setup)
+	channel = FakeChannel()
+	for event_type, payload in records:
+		if event_type != EVENT_GUESS:
+			continue
+		base_command = HEADS_COMMAND if payload[0] else TAILS_COMMAND
+		if not await instance.handle_public_message(base_command, channel.receive(base_command, None, [])):
+			break
+	return instance.events
+
+REPLAYERS = {
+	GameCthulhu: replay_cthulhu,
+	GameCoin: replay_coin,
+}
+
+#replay one event log, returning whether it replayed the same way, or None if it can't be replayed
+async def replay_log(games_by_command, events):
+	records = read_events(events)
+	if not records or records[0][0] != EVENT_START:
+		return None
+	game_command, setup = read_start(records[0][1])
+	lazy_game = games_by_command.get(game_command)
+	replayer = lazy_game and REPLAYERS.get(type(lazy_game.load()))
+	if not replayer:
+		return None
+	return await replayer(lazy_game.load(), setup, records) == events
+
+async def replay_files(paths):
+	games_by_command = {game.base_command(): game for game in lazy_games(find_game_manifests())}
+	results = {True: 0, False: 0, None: 0}
+	start = time.perf_counter()
+	for path in paths:
+		for events in read_logs(path):
+			results[await replay_log(games_by_command, events)] += 1
+	elapsed = time.perf_counter() - start
+	replayed_count = results[True] + results[False]
+	print(f"replayed {replayed_count} games in {elapsed:.2f}s ({replayed_count / max(elapsed, 1e-9):.0f} games/sec)")
+	print(f"    matching: {results[True]}, mismatched: {results[False]}, not replayable: {results[None]}")
+	return results[False] == 0
+
+#usage: gamebot_replay.py event_log.bin ...
+if __name__ == "__main__":
+	sys.exit(0 if asyncio.run(replay_files(sys.argv[1:])) else 1)
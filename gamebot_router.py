@@ -0,0 +1,16 @@
+class CommandRouter:
+	def __init__(self, games):
+		self.games = games
+		self.game_by_command = {}
+		self.commands_by_game = {}
+		#the !help listing for these games, built by the client the first time it's needed
+		self.help_message = None
+		for game in games:
+			self.game_by_command[game.base_command()] = game
+			self.commands_by_game[game] = frozenset(game.game_commands())
+
+	def find_game(self, base_command):
+		return self.game_by_command.get(base_command)
+
+	def game_commands(self, game):
+		return self.commands_by_game[game]
@@ -0,0 +1,90 @@
+import discord
+import inspect
+from discord import app_commands
+from typing import Optional
+
+from game_common import COMMAND_PREFIX
+
+#how many players a slash command to start a game can name; bigger games can still be started with a text command
+SLASH_MAX_PLAYERS = 12
+MAILBOX_FULL_TEXT = "Too many commands in this channel at once, please try again"
+
+#stands in for the message of the text command that a slash command is equivalent to, so that games handle both the
+#	same way; reactions are collected and shown in the interaction's response instead
+class InteractionMessage:
+	def __init__(self, interaction, content, mentions, message_id):
+		self.channel = interaction.channel
+		self.content = content
+		self.author = interaction.user
+		self.mentions = mentions
+		self.id = message_id
+		self.reactions = []
+
+	async def add_reaction(self, emoji):
+		self.reactions.append(emoji)
+
+def command_parameter(name, annotation, default = None):
+	return inspect.Parameter(name, inspect.Parameter.KEYWORD_ONLY, annotation=annotation, default=default)
+
+#a slash command for the text command, with player_count player options, the first required_player_count of them
+#	required, and an optional arguments option for the rest of the text command if it has a description
+def slash_command(
+		client, text_command, description, player_count, arguments_description = None, required_player_count = 0):
+	player_names = ["player" if player_count == 1 else f"player{number}" for number in range(1, player_count + 1)]
+
+	async def callback(interaction, **options):
+		#text commands never mention anyone twice, so naming the same player in two options counts once, and a game that
+		#	ends up with too few distinct players turns the start down like it would for a text command
+		players = list(dict.fromkeys(options[name] for name in player_names if options.get(name)))
+		content = " ".join(
+			[text_command] + [player.mention for player in players] + [options.get("arguments") or ""]).strip()
+		message = InteractionMessage(interaction, content, players, interaction.id)
+		if not client.is_command(message):
+			await interaction.response.send_message("Games can't be played in this channel", ephemeral=True)
+			return
+		#acknowledge right away, sending role DMs and the board can take a while
+		response = await interaction.response.defer(thinking=True)
+		if response and response.message_id:
+			message.id = response.message_id
+		handled = client.actors.submit(interaction.channel.id, lambda: client.handle_command(message))
+		if handled:
+			await handled
+		await interaction.edit_original_response(
+			content=" ".join([content] + message.reactions) if handled else MAILBOX_FULL_TEXT,
+			allowed_mentions=discord.AllowedMentions.none())
+
+	#app_commands reads the options from the callback's signature
+	parameters = [inspect.Parameter("interaction", inspect.Parameter.POSITIONAL_ONLY, annotation=discord.Interaction)]
+	parameters += [
+		command_parameter(name, discord.Member, inspect.Parameter.empty) for name in player_names[:required_player_count]]
+	parameters += [command_parameter(name, Optional[discord.Member]) for name in player_names[required_player_count:]]
+	if arguments_description:
+		parameters.append(command_parameter("arguments", Optional[str]))
+		callback = app_commands.describe(arguments=arguments_description)(callback)
+	callback.__signature__ = inspect.Signature(parameters)
+	callback = app_commands.guild_only(callback)
+	return app_commands.Command(name=text_command[len(COMMAND_PREFIX):], description=description, callback=callback)
+
+#slash commands for starting every game, every in-game command, and the client's own commands
+def build_slash_commands(client, client_commands):
+	commands = {}
+	for game in client.available_games:
+		start_player_count = game.start_player_count()
+		commands[game.base_command()] = slash_command(
+			client,
+			game.base_command(),
+			f"Start a game of {game.base_command()[len(COMMAND_PREFIX):]}",
+			SLASH_MAX_PLAYERS if start_player_count is None else min(start_player_count, SLASH_MAX_PLAYERS),
+			"Anything else to add after the players, like a guess")
+		for game_command in game.game_commands():
+			if game_command not in commands:
+				move_player_count = game.move_player_count()
+				commands[game_command] = slash_command(
+					client,
+					game_command,
+					"Make a move in this channel's game",
+					move_player_count,
+					required_player_count=move_player_count)
+	for text_command, description, arguments_description in client_commands:
+		commands[text_command] = slash_command(client, text_command, description, 0, arguments_description)
+	return list(commands.values())
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import os
+
+SNAPSHOT_VERSION = 2
+SNAPSHOT_INTERVAL = 5
+
+#saves the state of active games to one small JSON file per channel; game state is captured on the event loop so that
+#	it's consistent, and all file IO happens on a worker thread
+class SnapshotStore:
+	def __init__(self, directory, log):
+		self.directory = directory
+		self.log = log
+		#channel id -> game to save, or None to delete the channel's snapshot
+		self.dirty_channels = {}
+
+	def channel_path(self, channel_id):
+		return os.path.join(self.directory, f"{channel_id}.json")
+
+	def mark_dirty(self, channel_id, game):
+		self.dirty_channels[channel_id] = game
+
+	def mark_removed(self, channel_id):
+		self.dirty_channels[channel_id] = None
+
+	async def run(self):
+		while True:
+			await asyncio.sleep(SNAPSHOT_INTERVAL)
+			await self.flush()
+
+	#channels whose snapshot couldn't be captured or written stay dirty, so they're tried again on the next flush
+	async def flush(self):
+		if not self.dirty_channels:
+			return
+		dirty_channels = self.dirty_channels
+		self.dirty_channels = {}
+		snapshots = {}
+		failures = {}
+		for channel_id, game in dirty_channels.items():
+			try:
+				state = game.to_snapshot() if game else None
+			except Exception as exception:
+				failures[channel_id] = repr(exception)
+				continue
+			snapshots[channel_id] = None if state is None else \
+				{"version": SNAPSHOT_VERSION, "game": game.available_game.base_command(), "state": state}
+		failures.update(await asyncio.get_running_loop().run_in_executor(None, self.write_snapshots, snapshots))
+		for channel_id, error in failures.items():
+			self.log.log("snapshot_failed", channel=channel_id, error=error)
+			#unless the channel was marked again while this flush was running
+			self.dirty_channels.setdefault(channel_id, dirty_channels[channel_id])
+
+	#returns channel id -> error for the snapshots that couldn't be written
+	def write_snapshots(self, snapshots):
+		try:
+			os.makedirs(self.directory, exist_ok=True)
+		except OSError as exception:
+			return {channel_id: repr(exception) for channel_id in snapshots}
+		failures = {}
+		for channel_id, snapshot in snapshots.items():
+			path = self.channel_path(channel_id)
+			try:
+				if not snapshot:
+					if os.path.exists(path):
+						os.remove(path)
+					continue
+				temp_path = path + ".tmp"
+				with open(temp_path, "w", encoding="utf-8") as file:
+					json.dump(snapshot, file, ensure_ascii=False, separators=(",", ":"))
+				os.replace(temp_path, path)
+			except Exception as exception:
+				failures[channel_id] = repr(exception)
+		return failures
+
+	#channel id -> when its snapshot was last written, which is when its game last changed, and the base command of
+	#	the game, or None if the snapshot can't be restored
+	async def list_channels(self):
+		return await asyncio.get_running_loop().run_in_executor(None, self.read_channels)
+
+	def read_channels(self):
+		if not os.path.isdir(self.directory):
+			return {}
+		channels = {}
+		for name in os.listdir(self.directory):
+			if not name.endswith(".json"):
+				continue
+			channel_id = int(name[:-5])
+			try:
+				saved_time = os.path.getmtime(self.channel_path(channel_id))
+			except OSError:
+				continue
+			snapshot = self.read_snapshot(channel_id)
+			channels[channel_id] = (saved_time, snapshot and snapshot.get("game"))
+		return channels
+
+	async def load(self, channel_id):
+		return await asyncio.get_running_loop().run_in_executor(None, self.read_snapshot, channel_id)
+
+	def read_snapshot(self, channel_id):
+		try:
+			with open(self.channel_path(channel_id), encoding="utf-8") as file:
+				snapshot = json.load(file)
+		except (OSError, ValueError):
+			return None
+		return snapshot if snapshot.get("version") == SNAPSHOT_VERSION else None
@@ -0,0 +1,42 @@
+import subprocess
+import sys
+import time
+
+RESTART_DELAY = 5
+
+#the shard that Discord delivers a guild's events to
+def shard_for_guild(guild_id, shard_count):
+	return (guild_id >> 22) % shard_count
+
+#split shards 0..shard_count-1 into process_count groups as evenly as possible
+def shard_groups(shard_count, process_count):
+	return [list(range(first_shard, shard_count, process_count)) for first_shard in range(0, process_count)]
+
+#usage: gamebot_supervisor.py [shard count] [process count]
+#with no arguments this runs a single process and lets discord.py pick the shard count
+def main(argv):
+	commands = [(sys.executable, "gamebot_main.py")]
+	if len(argv) >= 2:
+		shard_count = int(argv[1])
+		process_count = min(int(argv[2]) if len(argv) >= 3 else shard_count, shard_count)
+		commands = [
+			(sys.executable, "gamebot_main.py", str(shard_count)) + tuple(str(shard_id) for shard_id in shard_ids)
+				for shard_ids in shard_groups(shard_count, process_count)
+		]
+	processes = {command: subprocess.Popen(command) for command in commands}
+	try:
+		while True:
+			time.sleep(RESTART_DELAY)
+			for command, process in processes.items():
+				if process.poll() is None:
+					continue
+				print(f"{' '.join(command[1:])} exited with code {process.returncode}, restarting")
+				processes[command] = subprocess.Popen(command)
+	except KeyboardInterrupt:
+		for process in processes.values():
+			process.terminate()
+		for process in processes.values():
+			process.wait()
+
+if __name__ == "__main__":
+	main(sys.argv)
@@ -0,0 +1,55 @@
+import asyncio
+import math
+
+#a hashed timer wheel: timers are kept in one of slot_count buckets by their deadline tick, so scheduling, moving and
+#	cancelling a timer is O(1) and each tick only looks at one bucket, however many timers there are
+class TimerWheel:
+	__slots__ = ("tick", "slots", "current_tick", "timer_slots")
+
+	def __init__(self, tick, slot_count):
+		self.tick = tick
+		#each slot maps key -> (deadline tick, value); a slot also holds timers that are whole turns of the wheel away
+		self.slots = [{} for _ in range(0, slot_count)]
+		self.current_tick = 0
+		#key -> the slot its timer is in
+		self.timer_slots = {}
+
+	def __len__(self):
+		return len(self.timer_slots)
+
+	#call back with value after delay seconds, replacing any timer that key already has
+	def schedule(self, key, value, delay):
+		self.cancel(key)
+		deadline = self.current_tick + max(math.ceil(delay / self.tick), 1)
+		slot = self.slots[deadline % len(self.slots)]
+		slot[key] = (deadline, value)
+		self.timer_slots[key] = slot
+
+	#seconds until key's timer expires, to the tick, or None if it has none
+	def remaining(self, key):
+		slot = self.timer_slots.get(key)
+		return None if slot is None else (slot[key][0] - self.current_tick) * self.tick
+
+	def cancel(self, key):
+		slot = self.timer_slots.pop(key, None)
+		if slot is not None:
+			del slot[key]
+
+	#move the wheel one tick forward, and return the values of the timers that expired
+	def advance(self):
+		self.current_tick += 1
+		slot = self.slots[self.current_tick % len(self.slots)]
+		expired_keys = [key for key, (deadline, _) in slot.items() if deadline <= self.current_tick]
+		for key in expired_keys:
+			del self.timer_slots[key]
+		return [slot.pop(key)[1] for key in expired_keys]
+
+	async def run(self, on_expire):
+		loop = asyncio.get_running_loop()
+		start = loop.time()
+		while True:
+			await asyncio.sleep(self.tick)
+			#catch up on ticks that were missed while the loop was busy
+			while self.current_tick < (loop.time() - start) // self.tick:
+				for value in self.advance():
+					await on_expire(value)
@@ -1,2 +1,2 @@
-python gamebot_main.py
+python gamebot_supervisor.py
 pause